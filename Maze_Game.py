@@ -1,17 +1,56 @@
+import time
+_IMPORT_START = time.perf_counter()
+
+import argparse
 import pygame
 import random
 import heapq
+import importlib
+import json
 import math
+import struct
 import sys
+from array import array
+from collections import deque
+from itertools import islice
 from pygame import gfxdraw
 
+IMPORT_MS = (time.perf_counter() - _IMPORT_START) * 1000
+
 class MazeGame:
-    def __init__(self):
+    # Input actions in the order they are encoded in session recordings
+    ACTIONS = (
+        'move_player', 'click', 'move_ai', 'undo_ai', 'redo_ai',
+        'move_dijkstra', 'undo_dijkstra', 'redo_dijkstra',
+        'toggle_auto_ai', 'toggle_auto_dijkstra', 'toggle_help',
+        'reset', 'resize', 'speed', 'goals', 'toggle_fog', 'planner'
+    )
+    
+    # Path planners by name. A planner is called as planner(game, start, end,
+    # terrain=None, stats=None) and returns the cells after start; each AI picks
+    # one by name at runtime. Built-in planners are registered below the class.
+    PLANNERS = {}
+    AGENTS = ('ai', 'dijkstra')
+    
+    @classmethod
+    def register_planner(cls, name, planner=None):
+        # Works as a call or as a decorator: @MazeGame.register_planner('name')
+        if planner is None:
+            return lambda planner: cls.register_planner(name, planner)
+        cls.PLANNERS[name] = planner
+        return planner
+    
+    def __init__(self, seed=None, headless=False, size=20):
+        self.startup_timings = []
+        self.startup_clock = time.perf_counter()
+        
         # Game constants
         self.WIDTH, self.HEIGHT = 603, 804
-        self.ROWS, self.COLS = 20, 20
-        self.CELL_SIZE = 30
+        self.ROWS, self.COLS = size, size
+        self.CELL_SIZE = min(30, 600 // size)
         self.MAZE_OFFSET_Y = 200
+        self.IDLE_TIMEOUT_MS = 250  # Redraw interval while waiting for input
+        self.HISTORY_JUMP = 10  # Moves undone or redone at once by Shift/Ctrl+U and J
         
         # Colors
         self.COLORS = {
@@ -26,50 +65,156 @@ class MazeGame:
             'LIGHT_GRAY': (220, 220, 230),
             'Background': (170,170,170),
             'Wall': (31,56,100),
-            'ORANGE': (255, 165, 0)
+            'ORANGE': (255, 165, 0),
+            'Road': (205, 190, 150),
+            'Mud': (120, 95, 60),
+            'Water': (80, 140, 200)
         }
         
-        # Initialize pygame
-        pygame.init()
-        self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
-        pygame.display.set_caption("Interactive Maze Game")
+        # Terrain move costs (the cost of stepping onto a cell of that kind)
+        self.TERRAIN = {'Road': 1, 'Background': 2, 'Mud': 4, 'Water': 6}
+        self.MAX_TERRAIN_COST = max(self.TERRAIN.values())
+        self.MIN_TERRAIN_COST = min(self.TERRAIN.values())
+        self.PLAYER_STEP_FRAMES = 8  # Cooldown after stepping onto plain floor
+        
+        # Number of goals per level (reaching any of them wins)
+        self.goal_count = 1
+        
+        # Fog of war: everyone only sees cells in line of sight within this radius
+        self.fog = False
+        self.VIEW_RADIUS = 5
+        
+        # Landmarks give A* much tighter lower bounds than Manhattan distance, but
+        # building them costs more than the one or two A* queries a maze usually
+        # gets, so they are opt-in (or loaded with load_landmarks)
+        self.LANDMARK_COUNT = 4
+        self.use_landmarks = False
+        
+        # Which registered planner each AI uses, the stats of its latest query, and
+        # callbacks that receive the stats of every query (see --metrics)
+        self.agent_planners = {'ai': 'a_star', 'dijkstra': 'goal_field'}
+        self.planner_stats = {}
+        self.metrics_listeners = []
+        self.hud_surface = None
+        
+        # Maze generation draws from its own seeded generator so a session can be replayed
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+        self.frame = 0
+        self.recorder = None
+        
+        # Only the display is needed up front (not audio or joysticks). Headless
+        # games create an offscreen surface on their first draw.
+        # pygame.time.get_ticks needs SDL's timer subsystem, which display.init does
+        # not start, so time-driven animations read the game's own clock instead
+        self.clock_start = time.perf_counter()
+        self.headless = headless
+        self.screen = None
+        if not headless:
+            pygame.display.init()
+            self.mark_startup("display init")
+            self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
+            pygame.display.set_caption("Interactive Maze Game")
+            self.mark_startup("window")
         
-        # Fonts
-        self.font_large = pygame.font.Font(None, 72)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_small = pygame.font.Font(None, 24)
-        self.font_tiny = pygame.font.Font(None, 18)
+        # Fonts are loaded on first use
+        self.fonts = {}
+        
+        # Full-screen overlays are built on first use and reused every frame
+        self.darken_overlay = None
+        self.help_overlay = None
+        self.celebration_surface = None
+        self.celebration_surface_alpha = -1
         
         # Game state
         self.reset_game()
+        self.mark_startup("maze generation")
         
         # UI Elements
         self.create_ui_elements()
+        self.mark_startup("ui elements")
+        
+    def mark_startup(self, phase):
+        now = time.perf_counter()
+        self.startup_timings.append((phase, (now - self.startup_clock) * 1000))
+        self.startup_clock = now
+    
+    def print_startup_report(self):
+        print("Startup timing (ms):")
+        print(f"  {'import':<18}{IMPORT_MS:8.1f}")
+        total = IMPORT_MS
+        for phase, ms in self.startup_timings:
+            print(f"  {phase:<18}{ms:8.1f}")
+            total += ms
+        print(f"  {'total':<18}{total:8.1f}")
+    
+    def ticks(self):
+        # Milliseconds since the game was created
+        return int((time.perf_counter() - self.clock_start) * 1000)
+
+    def get_font(self, size):
+        if size not in self.fonts:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+    
+    @property
+    def font_large(self):
+        return self.get_font(72)
+    
+    @property
+    def font_medium(self):
+        return self.get_font(36)
+    
+    @property
+    def font_small(self):
+        return self.get_font(24)
+    
+    @property
+    def font_tiny(self):
+        return self.get_font(18)
         
     def reset_game(self):
         self.maze = self.generate_maze()
         self.start = (0, 0)
-        self.goal = (self.COLS-1, self.ROWS-1)
+        
+        # Goals fill the far corners; self.goal is the primary one
+        self.goals = [(self.COLS-1, self.ROWS-1), (self.COLS-1, 0), (0, self.ROWS-1)][:self.goal_count]
+        self.goal = self.goals[0]
+        for x, y in self.goals:
+            self.maze[y][x] = 0
+        self.terrain = self.generate_terrain()
+        self.maze_layer = None
+        
         self.player = self.start
         self.ai_position = self.start
-        self.ai_path = self.a_star(self.ai_position, self.goal)
-        self.ai_previous_positions = []
-        
-        # Dijkstra AI initialization
         self.dijkstra_position = self.start
-        self.dijkstra_path = self.dijkstra(self.dijkstra_position, self.goal)
-        self.dijkstra_previous_positions = []
         
-        # Trail tracking
-        self.ai_trail = []
-        self.dijkstra_trail = []
+        # Other players' positions when rendering a multiplayer session (maze_server.py)
+        self.remote_players = {}
+        
+        # Paths are planned by plan_agents, after the first frame is on screen
+        self.agents_planned = False
+        self.landmarks = None
+        self.ai_path = deque()
+        self.dijkstra_path = deque()
+        
+        if self.fog:
+            self.init_fog()
+        
+        # Move history (doubles as the trail drawn behind each AI)
+        self.ai_history = self.MoveHistory(self.COLS, self.ROWS, self.ai_position)
+        self.dijkstra_history = self.MoveHistory(self.COLS, self.ROWS, self.dijkstra_position)
         
         self.game_over = False
         self.victory = False
         self.particles = []
-        self.confetti = [self.Confetti() for _ in range(150)]
+        self.confetti = None  # Created when the celebration first plays
         self.celebration_alpha = 0
-        self.celebration_surface = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
+        
+        # Frames before the player may step again; longer after entering costly terrain
+        self.player_cooldown = 0
         
         # Animation states
         self.player_anim = 0
@@ -113,6 +258,9 @@ class MazeGame:
                                             (255, 150, 50), (220, 120, 30), (180, 90, 20))
         self.help_button = self.Button(470, 70, 80, 40, "Help", 
                                     (100, 100, 255), (50, 50, 220), (30, 30, 180))
+        self.buttons = [self.move_ai_button, self.undo_ai_button, self.auto_ai_button,
+                        self.reset_button, self.move_dijkstra_button, self.undo_dijkstra_button,
+                        self.auto_dijkstra_button, self.help_button]
         
         # Create sliders
         self.speed_slider = self.Slider(20, 140, 200, 20, 1, 20, 10, "Speed")
@@ -128,6 +276,7 @@ class MazeGame:
             self.current_color = color
             self.rounded = rounded
             self.pressed = False
+            self.hovered = False
             self.hover_anim = 0
             self.click_anim = 0
             self.shadow_offset = 3
@@ -185,7 +334,8 @@ class MazeGame:
             surface.blit(text_surf, text_rect)
             
         def check_hover(self, pos):
-            if self.rect.collidepoint(pos):
+            self.hovered = self.rect.collidepoint(pos)
+            if self.hovered:
                 self.current_color = self.hover_color
                 if self.hover_anim < 20:  # 20 frames to reach full hover effect
                     self.hover_anim += 4
@@ -196,6 +346,14 @@ class MazeGame:
                     self.hover_anim -= 4
                 return False
         
+        def is_animating(self):
+            # Hover fades rest at full strength while hovered and at zero otherwise
+            if self.click_anim > 0:
+                return True
+            if self.hovered:
+                return self.hover_anim < 20
+            return self.hover_anim > 0
+        
         def is_clicked(self, pos, event):
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if self.rect.collidepoint(pos):
@@ -259,6 +417,206 @@ class MazeGame:
                 return True
             return False
 
+    class MoveHistory:
+        # Positions are packed into flat cell indices (2 bytes each on any maze the
+        # slider allows). Entries before the cursor form the trail, entries after
+        # it are moves that can be redone.
+        def __init__(self, cols, rows, start):
+            self.cols = cols
+            self.log = array('H' if cols * rows <= 0xFFFF else 'I')
+            self.log.append(self.pack(start))
+            self.cursor = 0
+            
+        def pack(self, pos):
+            return pos[1] * self.cols + pos[0]
+        
+        def unpack(self, index):
+            return (index % self.cols, index // self.cols)
+        
+        def push(self, pos):
+            # A new move discards the redo branch
+            if self.cursor + 1 < len(self.log):
+                del self.log[self.cursor + 1:]
+            self.log.append(self.pack(pos))
+            self.cursor += 1
+            
+        def can_undo(self):
+            return self.cursor > 0
+        
+        def can_redo(self):
+            return self.cursor + 1 < len(self.log)
+        
+        def undo(self, steps=1):
+            self.cursor = max(0, self.cursor - steps)
+            return self.unpack(self.log[self.cursor])
+        
+        def redo(self, steps=1):
+            self.cursor = min(len(self.log) - 1, self.cursor + steps)
+            return self.unpack(self.log[self.cursor])
+        
+        def trail(self):
+            for i in range(self.cursor):
+                yield self.unpack(self.log[i])
+
+    class FieldOfView:
+        # Recursive shadowcasting over one viewer's surroundings. Walls block sight but
+        # are seen themselves. Each update only touches cells within the view radius.
+        OCTANTS = [
+            (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+            (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)
+        ]
+        
+        def __init__(self, cols, rows, radius):
+            self.cols = cols
+            self.rows = rows
+            self.radius = radius
+            self.explored = bytearray(cols * rows)
+            self.visible = set()
+            
+        def update(self, pos, terrain):
+            # Returns the cells seen for the first time and the cells whose visibility changed
+            x, y = pos
+            visible = {y * self.cols + x}
+            for xx, xy, yx, yy in self.OCTANTS:
+                self.cast(x, y, 1, 1.0, 0.0, xx, xy, yx, yy, terrain, visible)
+            
+            newly_explored = [cell for cell in visible if not self.explored[cell]]
+            for cell in newly_explored:
+                self.explored[cell] = 1
+            changed = visible ^ self.visible
+            self.visible = visible
+            return newly_explored, changed
+        
+        def cast(self, cx, cy, row, start, end, xx, xy, yx, yy, terrain, visible):
+            if start < end:
+                return
+            radius_sq = self.radius * self.radius
+            new_start = start
+            for depth in range(row, self.radius + 1):
+                dx, dy = -depth - 1, -depth
+                blocked = False
+                while dx <= 0:
+                    dx += 1
+                    left_slope = (dx - 0.5) / (dy + 0.5)
+                    right_slope = (dx + 0.5) / (dy - 0.5)
+                    if start < right_slope:
+                        continue
+                    if end > left_slope:
+                        break
+                    
+                    x = cx + dx * xx + dy * xy
+                    y = cy + dx * yx + dy * yy
+                    inside = 0 <= x < self.cols and 0 <= y < self.rows
+                    if inside and dx * dx + dy * dy <= radius_sq:
+                        visible.add(y * self.cols + x)
+                    opaque = not inside or terrain[y * self.cols + x] == 0
+                    
+                    if blocked:
+                        if opaque:
+                            new_start = right_slope
+                        else:
+                            blocked = False
+                            start = new_start
+                    elif opaque and depth < self.radius:
+                        # Scan the part of the next row that this wall does not hide
+                        blocked = True
+                        self.cast(cx, cy, depth + 1, start, left_slope, xx, xy, yx, yy, terrain, visible)
+                        new_start = right_slope
+                if blocked:
+                    break
+
+    class SearchStats:
+        # Work done by one planner query. Searches fill in the counters (a bucket
+        # queue counts its buckets as the heap); run_planner adds the rest.
+        FIELDS = ('frame', 'agent', 'planner', 'ms', 'expanded', 'pushes', 'pops', 
+                  'peak_open', 'length', 'cost')
+        
+        def __init__(self, planner, agent=None, frame=0):
+            self.frame = frame
+            self.agent = agent
+            self.planner = planner
+            self.ms = 0.0
+            self.expanded = self.pushes = self.pops = self.peak_open = 0
+            self.length = self.cost = 0
+            
+        def count(self, expanded, pushes, pops, peak_open):
+            self.expanded += expanded
+            self.pushes += pushes
+            self.pops += pops
+            self.peak_open = max(self.peak_open, peak_open)
+            
+        def as_dict(self):
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+    class Landmarks:
+        # ALT tables. For each landmark L, to_cells[v] is the cost from L to v and
+        # from_cells[v] the cost from v back to L (they differ because a move costs the
+        # terrain of the cell entered). Unreachable cells hold the type's maximum.
+        MAGIC = b'MZLM'
+        VERSION = 1
+        # magic, version, rows, cols, landmark count, table typecode
+        HEADER = struct.Struct('<4sBHHBc')
+        
+        def __init__(self, rows, cols, cells, tables):
+            self.rows = rows
+            self.cols = cols
+            self.cells = cells  # array('I') of landmark cell indices
+            self.tables = tables  # list of (to_cells, from_cells) arrays
+            
+        def bound(self, cell, target):
+            # By the triangle inequality, d(cell, target) is at least
+            # d(L, target) - d(L, cell) and d(cell, L) - d(target, L) for every L
+            best = 0
+            for to_cells, from_cells in self.tables:
+                forward = to_cells[target] - to_cells[cell]
+                backward = from_cells[cell] - from_cells[target]
+                if forward > best:
+                    best = forward
+                if backward > best:
+                    best = backward
+            return best
+        
+        def nbytes(self):
+            return sum(t.itemsize * len(t) for pair in self.tables for t in pair)
+        
+        def save(self, path, terrain):
+            # The terrain goes in too; the tables are only valid for this exact maze
+            typecode = self.tables[0][0].typecode if self.tables else 'H'
+            with open(path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.rows, self.cols, 
+                                         len(self.cells), typecode.encode()))
+                for data in [terrain, self.cells] + [t for pair in self.tables for t in pair]:
+                    if sys.byteorder == 'big':
+                        data = array(data.typecode, data)
+                        data.byteswap()
+                    f.write(data.tobytes())
+        
+        @classmethod
+        def load(cls, path):
+            # Returns (landmarks, terrain they were computed on)
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, version, rows, cols, count, typecode = cls.HEADER.unpack_from(data)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise ValueError(f"{path} is not a version {cls.VERSION} landmark file")
+            
+            arrays = []
+            offset = cls.HEADER.size
+            for code, length in [('B', rows * cols), ('I', count)] + [(typecode.decode(), rows * cols)] * (2 * count):
+                chunk = array(code)
+                end = offset + chunk.itemsize * length
+                if end > len(data):
+                    raise ValueError(f"{path} is truncated")
+                chunk.frombytes(data[offset:end])
+                if sys.byteorder == 'big':
+                    chunk.byteswap()
+                arrays.append(chunk)
+                offset = end
+            
+            terrain, cells = arrays[0], arrays[1]
+            tables = list(zip(arrays[2::2], arrays[3::2]))
+            return cls(rows, cols, cells, tables), terrain
+
     class Particle:
         def __init__(self, x, y):
             self.x = x
@@ -352,7 +710,7 @@ class MazeGame:
                 walls.append((nx, ny, start_x, start_y))
 
         while walls:
-            wall_index = random.randint(0, len(walls)-1)
+            wall_index = self.rng.randint(0, len(walls)-1)
             wx, wy, cx, cy = walls.pop(wall_index)
             nx, ny = cx + (wx - cx)*2, cy + (wy - cy)*2
             if 0 <= nx < self.COLS and 0 <= ny < self.ROWS:
@@ -370,19 +728,86 @@ class MazeGame:
         maze[self.ROWS-1][self.COLS-1] = 0
         return maze
 
+    def generate_terrain(self):
+        # Flat array of move costs, one byte per cell; walls cost 0 (impassable)
+        floor = self.TERRAIN['Background']
+        terrain = array('B', (floor if cell == 0 else 0 for row in self.maze for cell in row))
+        open_cells = [i for i, cost in enumerate(terrain) if cost]
+        kinds = [self.TERRAIN['Road'], self.TERRAIN['Mud'], self.TERRAIN['Water']]
+        
+        # Lay down short random-walk patches of each kind along the corridors
+        for _ in range(len(open_cells) // 25):
+            cell = self.rng.choice(open_cells)
+            cost = self.rng.choice(kinds)
+            for _ in range(self.rng.randint(3, 12)):
+                terrain[cell] = cost
+                neighbors = [n for n in self.neighbors(cell) if terrain[n]]
+                if not neighbors:
+                    break
+                cell = self.rng.choice(neighbors)
+        
+        # Keep the start and goals plain floor
+        for x, y in [self.start] + self.goals:
+            terrain[y * self.COLS + x] = floor
+        return terrain
+
+    def neighbors(self, cell):
+        # Flat indices of the in-bounds cells next to a flat cell index
+        x = cell % self.COLS
+        if cell >= self.COLS:
+            yield cell - self.COLS
+        if x < self.COLS - 1:
+            yield cell + 1
+        if cell + self.COLS < self.ROWS * self.COLS:
+            yield cell + self.COLS
+        if x > 0:
+            yield cell - 1
+
+    def trace_path(self, came_from, cell):
+        # Walks flat-index back pointers to the start and returns (x, y) steps
+        path = []
+        while came_from[cell] >= 0:
+            path.append((cell % self.COLS, cell // self.COLS))
+            cell = came_from[cell]
+        return path[::-1]
+
+    def path_cost(self, path):
+        return sum(self.terrain[y * self.COLS + x] for x, y in path)
+
     def heuristic(self, a, b):
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+        # Manhattan distance scaled by the cheapest terrain stays admissible and consistent
+        return (abs(a[0] - b[0]) + abs(a[1] - b[1])) * self.MIN_TERRAIN_COST
+
+    def landmark_heuristic(self, a, b):
+        cols = self.COLS
+        return max(self.heuristic(a, b), 
+                   self.landmarks.bound(a[1] * cols + a[0], b[1] * cols + b[0]))
 
-    def a_star(self, start, end):
+    def a_star(self, start, end, terrain=None, heuristic=None, stats=None):
+        # terrain overrides the real costs, e.g. with what an agent believes under fog
+        if heuristic is None:
+            # Landmark bounds only hold on the terrain they were computed for
+            use_landmarks = terrain is None and self.landmarks is not None
+            heuristic = self.landmark_heuristic if use_landmarks else self.heuristic
+        terrain = self.terrain if terrain is None else terrain
         open_set = []
         heapq.heappush(open_set, (0, start))
         came_from = {}
         g_score = {start: 0}
-        f_score = {start: self.heuristic(start, end)}
+        f_score = {start: heuristic(start, end)}
+        # Both heuristics are consistent, so a cell never needs expanding twice
+        closed = set()
+        pushes, pops, peak_open = 1, 0, 1
         
         while open_set:
             _, current = heapq.heappop(open_set)
+            pops += 1
+            if current in closed:
+                continue
+            closed.add(current)
             if current == end:
+                if stats is not None:
+                    stats.count(len(closed), pushes, pops, peak_open)
                 path = []
                 while current in came_from:
                     path.append(current)
@@ -392,24 +817,345 @@ class MazeGame:
             x, y = current
             for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
                 neighbor = (x + dx, y + dy)
-                if 0 <= neighbor[0] < self.COLS and 0 <= neighbor[1] < self.ROWS and self.maze[neighbor[1]][neighbor[0]] == 0:
-                    temp_g_score = g_score[current] + 1
+                if 0 <= neighbor[0] < self.COLS and 0 <= neighbor[1] < self.ROWS and terrain[neighbor[1] * self.COLS + neighbor[0]]:
+                    temp_g_score = g_score[current] + terrain[neighbor[1] * self.COLS + neighbor[0]]
                     if neighbor not in g_score or temp_g_score < g_score[neighbor]:
                         came_from[neighbor] = current
                         g_score[neighbor] = temp_g_score
-                        f_score[neighbor] = temp_g_score + self.heuristic(neighbor, end)
+                        f_score[neighbor] = temp_g_score + heuristic(neighbor, end)
                         heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                        pushes += 1
+                        if len(open_set) > peak_open:
+                            peak_open = len(open_set)
+        if stats is not None:
+            stats.count(len(closed), pushes, pops, peak_open)
+        return []
+
+    def dijkstra(self, start, end, terrain=None, stats=None):
+        # Dial's algorithm: move costs are small integers, so a ring of buckets indexed
+        # by distance replaces the heap and every queue operation is O(1)
+        cols = self.COLS
+        terrain = self.terrain if terrain is None else terrain
+        ring = self.MAX_TERRAIN_COST + 1
+        buckets = [[] for _ in range(ring)]
+        dist = [-1] * (self.ROWS * cols)
+        came_from = [-1] * (self.ROWS * cols)
+        
+        start_cell = start[1] * cols + start[0]
+        end_cell = end[1] * cols + end[0]
+        dist[start_cell] = 0
+        buckets[0].append(start_cell)
+        pending = 1
+        current_cost = 0
+        expanded, pushes, pops, peak_open = 0, 1, 0, 1
+        
+        while pending:
+            bucket = buckets[current_cost % ring]
+            while bucket:
+                current = bucket.pop()
+                pending -= 1
+                pops += 1
+                if dist[current] != current_cost:
+                    continue  # Stale entry, already settled at a lower cost
+                expanded += 1
+                if current == end_cell:
+                    if stats is not None:
+                        stats.count(expanded, pushes, pops, peak_open)
+                    return self.trace_path(came_from, current)
+                
+                for neighbor in self.neighbors(current):
+                    step = terrain[neighbor]
+                    if step:
+                        new_cost = current_cost + step
+                        if dist[neighbor] < 0 or new_cost < dist[neighbor]:
+                            dist[neighbor] = new_cost
+                            came_from[neighbor] = current
+                            buckets[new_cost % ring].append(neighbor)
+                            pending += 1
+                            pushes += 1
+                if pending > peak_open:
+                    peak_open = pending
+            current_cost += 1
+        if stats is not None:
+            stats.count(expanded, pushes, pops, peak_open)
         return []
 
-    def dijkstra(self, start, end):
+    def goal_field(self, sources, terrain=None, stats=None):
+        # Multi-source Dial's Dijkstra run backwards from every source at once. Each cell
+        # gets the cost to its nearest source, that source's index and the next step
+        # toward it (-1 where no source is reachable).
+        cells = self.ROWS * self.COLS
+        terrain = self.terrain if terrain is None else terrain
+        ring = self.MAX_TERRAIN_COST + 1
+        buckets = [[] for _ in range(ring)]
+        dist = array('i', [-1]) * cells
+        label = array('b', [-1]) * cells
+        next_cell = array('i', [-1]) * cells
+        
+        for i, (x, y) in enumerate(sources):
+            cell = y * self.COLS + x
+            if dist[cell] < 0:
+                dist[cell] = 0
+                label[cell] = i
+                buckets[0].append(cell)
+        pending = len(buckets[0])
+        current_cost = 0
+        expanded, pushes, pops, peak_open = 0, pending, 0, pending
+        
+        while pending:
+            bucket = buckets[current_cost % ring]
+            while bucket:
+                current = bucket.pop()
+                pending -= 1
+                pops += 1
+                if dist[current] != current_cost:
+                    continue
+                expanded += 1
+                # Stepping from a neighbor onto this cell costs this cell's terrain
+                new_cost = current_cost + terrain[current]
+                for neighbor in self.neighbors(current):
+                    if terrain[neighbor] and (dist[neighbor] < 0 or new_cost < dist[neighbor]):
+                        dist[neighbor] = new_cost
+                        label[neighbor] = label[current]
+                        next_cell[neighbor] = current
+                        buckets[new_cost % ring].append(neighbor)
+                        pending += 1
+                        pushes += 1
+                if pending > peak_open:
+                    peak_open = pending
+            current_cost += 1
+        if stats is not None:
+            stats.count(expanded, pushes, pops, peak_open)
+        return dist, label, next_cell
+
+    def distances_from(self, source):
+        # Forward Dial's Dijkstra over the whole maze: cost from a flat cell index to
+        # every cell, -1 where unreachable
+        terrain = self.terrain
+        ring = self.MAX_TERRAIN_COST + 1
+        buckets = [[] for _ in range(ring)]
+        dist = array('i', [-1]) * (self.ROWS * self.COLS)
+        dist[source] = 0
+        buckets[0].append(source)
+        pending = 1
+        current_cost = 0
+        
+        while pending:
+            bucket = buckets[current_cost % ring]
+            while bucket:
+                current = bucket.pop()
+                pending -= 1
+                if dist[current] != current_cost:
+                    continue
+                for neighbor in self.neighbors(current):
+                    step = terrain[neighbor]
+                    if step and (dist[neighbor] < 0 or current_cost + step < dist[neighbor]):
+                        dist[neighbor] = current_cost + step
+                        buckets[dist[neighbor] % ring].append(neighbor)
+                        pending += 1
+            current_cost += 1
+        return dist
+
+    def build_landmarks(self, count=None):
+        # Farthest-point selection: each new landmark is the reachable cell farthest
+        # from all landmarks so far, starting from the cell farthest from the start.
+        # Bounds stay admissible on any terrain, loops and weights included, because
+        # they come from exact shortest-path costs.
+        count = self.LANDMARK_COUNT if count is None else count
+        cells = self.ROWS * self.COLS
+        nearest = self.distances_from(self.start[1] * self.COLS + self.start[0])
+        landmarks = array('I')
+        tables = []
+        for _ in range(count):
+            landmark = max(range(cells), key=nearest.__getitem__)
+            if nearest[landmark] <= 0:
+                break  # Every reachable cell is already a landmark
+            landmarks.append(landmark)
+            to_cells = self.distances_from(landmark)
+            from_cells = self.goal_field([(landmark % self.COLS, landmark // self.COLS)])[0]
+            tables.append((to_cells, from_cells))
+            # Reachability is symmetric, so -1 marks the same cells in every table
+            nearest = to_cells if len(tables) == 1 else array('i', map(min, nearest, to_cells))
+        
+        # Share one compact type across all tables so they persist as one block
+        reach = max((max(t) for pair in tables for t in pair), default=0)
+        typecode = 'H' if reach < 0xFFFF else 'I'
+        unreachable = 0xFFFF if typecode == 'H' else 0xFFFFFFFF
+        tables = [tuple(array(typecode, (d if d >= 0 else unreachable for d in t)) for t in pair)
+                  for pair in tables]
+        return self.Landmarks(self.ROWS, self.COLS, landmarks, tables)
+
+    def save_landmarks(self, path):
+        if self.landmarks is None:
+            self.landmarks = self.build_landmarks()
+        self.landmarks.save(path, self.terrain)
+
+    def load_landmarks(self, path):
+        landmarks, terrain = self.Landmarks.load(path)
+        if terrain != self.terrain:
+            raise ValueError(f"{path} was computed for a different maze")
+        self.landmarks = landmarks
+
+    def field_path(self, pos, field=None):
+        # Follows a goal field (the shared one by default) downhill; no search, just
+        # one lookup per step
+        dist, _, next_cell = field or (self.goal_dist, self.goal_label, self.goal_next)
+        cell = pos[1] * self.COLS + pos[0]
+        if dist[cell] < 0:
+            return []
+        path = []
+        while dist[cell] > 0:
+            cell = next_cell[cell]
+            path.append((cell % self.COLS, cell // self.COLS))
+        return path
+
+    def plan_agents(self):
+        if self.agents_planned:
+            return
+        self.agents_planned = True
+        
+        # One multi-source search labels every cell with its nearest goal, so agents
+        # route by following the field instead of running their own searches
+        self.goal_dist, self.goal_label, self.goal_next = self.goal_field(self.goals)
+        if self.use_landmarks and self.landmarks is None:
+            self.landmarks = self.build_landmarks()
+        self.ai_path = self.plan_ai_path(self.ai_position)
+        self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
+
+    def nearest_goal(self, pos):
+        label = self.goal_label[pos[1] * self.COLS + pos[0]]
+        return self.goals[label] if label >= 0 else self.goal
+
+    def field_planner(self, start, end, terrain=None, stats=None):
+        # Heads for whichever goal is nearest, so end is ignored. On the real terrain
+        # the shared goal field from plan_agents is just read, which is no search.
+        if terrain is None:
+            return self.field_path(start)
+        return self.field_path(start, self.goal_field(self.goals, terrain, stats))
+
+    def run_planner(self, name, start, end, terrain=None, agent=None):
+        # Runs a registered planner, timing it and publishing its stats
+        stats = self.SearchStats(name, agent, self.frame)
+        t0 = time.perf_counter()
+        path = self.PLANNERS[name](self, start, end, terrain=terrain, stats=stats)
+        stats.ms = (time.perf_counter() - t0) * 1000
+        stats.length = len(path)
+        stats.cost = self.path_cost(path)
+        if agent is not None:
+            self.planner_stats[agent] = stats
+            self.hud_surface = None
+        for listener in self.metrics_listeners:
+            listener(stats)
+        return path
+
+    def plan_path(self, agent, pos):
+        if self.fog:
+            # Plan on what this agent has seen; unseen cells are assumed to be floor.
+            # The goal field over the real maze would leak the unseen parts.
+            terrain = self.ai_belief if agent == 'ai' else self.dijkstra_belief
+            goal = min(self.goals, key=lambda goal: self.heuristic(pos, goal))
+        else:
+            terrain = None
+            goal = self.nearest_goal(pos)
+        return deque(self.run_planner(self.agent_planners[agent], pos, goal, terrain, agent))
+
+    def plan_ai_path(self, pos):
+        return self.plan_path('ai', pos)
+
+    def plan_dijkstra_path(self, pos):
+        return self.plan_path('dijkstra', pos)
+
+    def set_planner(self, agent, name):
+        self.agent_planners[agent] = name
+        if self.agents_planned and agent == 'ai':
+            self.ai_path = self.plan_ai_path(self.ai_position)
+        elif self.agents_planned:
+            self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
+
+    def next_planner(self, agent):
+        names = list(self.PLANNERS)
+        return (names.index(self.agent_planners[agent]) + 1) % len(names)
+
+    def init_fog(self):
+        cells = self.ROWS * self.COLS
+        self.player_view = self.FieldOfView(self.COLS, self.ROWS, self.VIEW_RADIUS)
+        self.ai_view = self.FieldOfView(self.COLS, self.ROWS, self.VIEW_RADIUS)
+        self.dijkstra_view = self.FieldOfView(self.COLS, self.ROWS, self.VIEW_RADIUS)
+        
+        # What each AI believes the terrain to be: unseen cells count as plain floor
+        floor = self.TERRAIN['Background']
+        self.ai_belief = array('B', [floor]) * cells
+        self.dijkstra_belief = array('B', [floor]) * cells
+        
+        self.fog_layer = None
+        self.update_player_view()
+        self.update_ai_view()
+        self.update_dijkstra_view()
+
+    def reveal(self, view, belief, pos, path):
+        # Updates an AI's view and belief; True if what it just learned lies on its path
+        newly_explored, _ = view.update(pos, self.terrain)
+        surprises = set()
+        for cell in newly_explored:
+            if belief[cell] != self.terrain[cell]:
+                belief[cell] = self.terrain[cell]
+                surprises.add((cell % self.COLS, cell // self.COLS))
+        return bool(surprises) and any(step in surprises for step in path)
+
+    def update_ai_view(self):
+        return self.reveal(self.ai_view, self.ai_belief, self.ai_position, self.ai_path)
+
+    def update_dijkstra_view(self):
+        return self.reveal(self.dijkstra_view, self.dijkstra_belief, self.dijkstra_position,
+                           self.dijkstra_path)
+
+    def update_player_view(self):
+        newly_explored, changed = self.player_view.update(self.player, self.terrain)
+        if self.fog_layer is not None:
+            for cell in changed.union(newly_explored):
+                self.paint_fog_cell(self.fog_layer, cell)
+
+    def visible_to_player(self, pos):
+        return not self.fog or pos[1] * self.COLS + pos[0] in self.player_view.visible
+
+    def paint_fog_cell(self, layer, cell):
+        if cell in self.player_view.visible:
+            alpha = 0
+        elif self.player_view.explored[cell]:
+            alpha = 160  # Remembered but out of sight
+        else:
+            alpha = 255
+        layer.fill((0, 0, 0, alpha), 
+                   ((cell % self.COLS) * self.CELL_SIZE, (cell // self.COLS) * self.CELL_SIZE, 
+                    self.CELL_SIZE, self.CELL_SIZE))
+
+    def build_fog_layer(self):
+        layer = pygame.Surface((self.COLS * self.CELL_SIZE, self.ROWS * self.CELL_SIZE), pygame.SRCALPHA)
+        layer = self.prepare_overlay(layer)
+        layer.fill((0, 0, 0, 255))
+        for cell, explored in enumerate(self.player_view.explored):
+            if explored:
+                self.paint_fog_cell(layer, cell)
+        return layer
+
+    def dijkstra_heap(self, start, end, terrain=None, stats=None):
+        # Binary-heap Dijkstra, kept as the baseline for benchmarks.py
+        terrain = self.terrain if terrain is None else terrain
         open_set = []
         heapq.heappush(open_set, (0, start))
         came_from = {}
         cost_so_far = {start: 0}
+        expanded, pushes, pops, peak_open = 0, 1, 0, 1
         
         while open_set:
             current_cost, current = heapq.heappop(open_set)
+            pops += 1
+            if current_cost > cost_so_far[current]:
+                continue  # Stale entry, already settled at a lower cost
+            expanded += 1
             if current == end:
+                if stats is not None:
+                    stats.count(expanded, pushes, pops, peak_open)
                 path = []
                 while current in came_from:
                     path.append(current)
@@ -419,25 +1165,42 @@ class MazeGame:
             x, y = current
             for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
                 neighbor = (x + dx, y + dy)
-                if 0 <= neighbor[0] < self.COLS and 0 <= neighbor[1] < self.ROWS and self.maze[neighbor[1]][neighbor[0]] == 0:
-                    new_cost = cost_so_far[current] + 1
+                if 0 <= neighbor[0] < self.COLS and 0 <= neighbor[1] < self.ROWS and terrain[neighbor[1] * self.COLS + neighbor[0]]:
+                    new_cost = cost_so_far[current] + terrain[neighbor[1] * self.COLS + neighbor[0]]
                     if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
                         cost_so_far[neighbor] = new_cost
                         came_from[neighbor] = current
                         heapq.heappush(open_set, (new_cost, neighbor))
+                        pushes += 1
+                        if len(open_set) > peak_open:
+                            peak_open = len(open_set)
+        if stats is not None:
+            stats.count(expanded, pushes, pops, peak_open)
         return []
 
-    def draw_maze(self):
+    def build_maze_layer(self):
+        # Walls and terrain only change on reset, so they are painted once per maze
+        colors = {cost: self.COLORS[name] for name, cost in self.TERRAIN.items()}
+        colors[0] = self.COLORS['Wall']
+        layer = pygame.Surface((self.COLS * self.CELL_SIZE, self.ROWS * self.CELL_SIZE))
         for y in range(self.ROWS):
             for x in range(self.COLS):
-                color = self.COLORS['Background'] if self.maze[y][x] == 0 else self.COLORS['Wall']
-                pygame.draw.rect(self.screen, color, 
-                                (x * self.CELL_SIZE, y * self.CELL_SIZE + self.MAZE_OFFSET_Y, 
+                color = colors[self.terrain[y * self.COLS + x]]
+                pygame.draw.rect(layer, color, 
+                                (x * self.CELL_SIZE, y * self.CELL_SIZE, 
                                  self.CELL_SIZE, self.CELL_SIZE))
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert()
+        return layer
+
+    def draw_maze(self):
+        if self.maze_layer is None:
+            self.maze_layer = self.build_maze_layer()
+        self.screen.blit(self.maze_layer, (0, self.MAZE_OFFSET_Y))
 
     def draw_trails(self):
         # Draw A* trail (yellow)
-        for i, (x, y) in enumerate(self.ai_trail):
+        for i, (x, y) in enumerate(self.ai_history.trail()):
             alpha = min(255, 150 + i * 3)  # Fade effect for older positions
             s = pygame.Surface((self.CELL_SIZE, self.CELL_SIZE), pygame.SRCALPHA)
             pygame.draw.rect(s, (*self.COLORS['YELLOW'], alpha//2), 
@@ -445,7 +1208,7 @@ class MazeGame:
             self.screen.blit(s, (x * self.CELL_SIZE, y * self.CELL_SIZE + self.MAZE_OFFSET_Y))
         
         # Draw Dijkstra trail (orange)
-        for i, (x, y) in enumerate(self.dijkstra_trail):
+        for i, (x, y) in enumerate(self.dijkstra_history.trail()):
             alpha = min(255, 150 + i * 3)  # Fade effect for older positions
             s = pygame.Surface((self.CELL_SIZE, self.CELL_SIZE), pygame.SRCALPHA)
             pygame.draw.rect(s, (*self.COLORS['ORANGE'], alpha//2), 
@@ -454,7 +1217,7 @@ class MazeGame:
 
     def draw_path(self):
         if self.ai_path:
-            for i, (x, y) in enumerate(self.ai_path[:0]):
+            for i, (x, y) in enumerate(islice(self.ai_path, 0)):
                 alpha = 255 - i * 50
                 if alpha <= 0:
                     break
@@ -468,8 +1231,12 @@ class MazeGame:
     def create_particles(self, x, y, count=100):
         return [self.Particle(x, y) for _ in range(count)]
 
+    def move_time(self, pos):
+        # How long entering a cell takes relative to plain floor (roads 0.5, water 3)
+        return self.terrain[pos[1] * self.COLS + pos[0]] / self.TERRAIN['Background']
+
     def move_player(self, dx, dy):
-        if self.game_over:
+        if self.game_over or self.player_cooldown:
             return
             
         new_pos = (self.player[0] + dx, self.player[1] + dy)
@@ -481,77 +1248,129 @@ class MazeGame:
             self.player_target = new_pos
             self.player_anim = 10
             self.player = new_pos
+            self.player_cooldown = round(self.PLAYER_STEP_FRAMES * self.move_time(new_pos))
+            if self.fog:
+                self.update_player_view()
             
-            if new_pos == self.goal:
+            if new_pos in self.goals:
                 self.game_over = True
                 self.victory = True
-                goal_x = self.goal[0] * self.CELL_SIZE + self.CELL_SIZE // 2
-                goal_y = self.goal[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y + self.CELL_SIZE // 2
+                goal_x = new_pos[0] * self.CELL_SIZE + self.CELL_SIZE // 2
+                goal_y = new_pos[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y + self.CELL_SIZE // 2
                 self.particles = self.create_particles(goal_x, goal_y, 200)
 
     def move_ai(self):
+        self.plan_agents()
         if self.game_over or not self.ai_path:
             return
             
-        # Add current position to trail before moving
-        self.ai_trail.append(self.ai_position)
-        
-        self.ai_previous_positions.append(self.ai_position)
-        if len(self.ai_previous_positions) > 100:
-            self.ai_previous_positions.pop(0)
-            
         self.ai_prev = self.ai_position
-        self.ai_position = self.ai_path.pop(0)
+        self.ai_position = self.ai_path.popleft()
         self.ai_target = self.ai_position
         self.ai_anim = 10
         
+        # Record the move (the old position becomes part of the trail)
+        self.ai_history.push(self.ai_position)
+        
+        # Under fog, replan when newly seen cells contradict the planned route
+        if self.fog and self.update_ai_view():
+            self.ai_path = self.plan_ai_path(self.ai_position)
+        
         if not self.ai_path:
-            self.ai_path = self.a_star(self.ai_position, self.goal)
+            self.ai_path = self.plan_ai_path(self.ai_position)
 
     def move_dijkstra(self):
+        self.plan_agents()
         if self.game_over or not self.dijkstra_path:
             return
             
-        # Add current position to trail before moving
-        self.dijkstra_trail.append(self.dijkstra_position)
-        
-        self.dijkstra_previous_positions.append(self.dijkstra_position)
-        if len(self.dijkstra_previous_positions) > 100:
-            self.dijkstra_previous_positions.pop(0)
-            
         self.dijkstra_prev = self.dijkstra_position
-        self.dijkstra_position = self.dijkstra_path.pop(0)
+        self.dijkstra_position = self.dijkstra_path.popleft()
         self.dijkstra_target = self.dijkstra_position
         self.dijkstra_anim = 10
         
+        # Record the move (the old position becomes part of the trail)
+        self.dijkstra_history.push(self.dijkstra_position)
+        
+        # Under fog, replan when newly seen cells contradict the planned route
+        if self.fog and self.update_dijkstra_view():
+            self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
+        
         if not self.dijkstra_path:
-            self.dijkstra_path = self.dijkstra(self.dijkstra_position, self.goal)
+            self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
 
-    def undo_ai_move(self):
-        if self.ai_previous_positions:
-            # Remove last position from trail
-            if self.ai_trail:
-                self.ai_trail.pop()
-                
+    def undo_ai_move(self, steps=1):
+        self.plan_agents()
+        if self.ai_history.can_undo():
             self.ai_prev = self.ai_position
-            self.ai_position = self.ai_previous_positions.pop()
+            self.ai_position = self.ai_history.undo(steps)
             self.ai_target = self.ai_position
             self.ai_anim = 10
-            self.ai_path = self.a_star(self.ai_position, self.goal)
+            if self.fog:
+                self.update_ai_view()
+            self.ai_path = self.plan_ai_path(self.ai_position)
 
-    def undo_dijkstra_move(self):
-        if self.dijkstra_previous_positions:
-            # Remove last position from trail
-            if self.dijkstra_trail:
-                self.dijkstra_trail.pop()
-                
+    def redo_ai_move(self, steps=1):
+        self.plan_agents()
+        if self.ai_history.can_redo():
+            self.ai_prev = self.ai_position
+            self.ai_position = self.ai_history.redo(steps)
+            self.ai_target = self.ai_position
+            self.ai_anim = 10
+            if self.fog:
+                self.update_ai_view()
+            self.ai_path = self.plan_ai_path(self.ai_position)
+
+    def undo_dijkstra_move(self, steps=1):
+        self.plan_agents()
+        if self.dijkstra_history.can_undo():
+            self.dijkstra_prev = self.dijkstra_position
+            self.dijkstra_position = self.dijkstra_history.undo(steps)
+            self.dijkstra_target = self.dijkstra_position
+            self.dijkstra_anim = 10
+            if self.fog:
+                self.update_dijkstra_view()
+            self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
+
+    def redo_dijkstra_move(self, steps=1):
+        self.plan_agents()
+        if self.dijkstra_history.can_redo():
             self.dijkstra_prev = self.dijkstra_position
-            self.dijkstra_position = self.dijkstra_previous_positions.pop()
+            self.dijkstra_position = self.dijkstra_history.redo(steps)
             self.dijkstra_target = self.dijkstra_position
             self.dijkstra_anim = 10
-            self.dijkstra_path = self.dijkstra(self.dijkstra_position, self.goal)
+            if self.fog:
+                self.update_dijkstra_view()
+            self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
+
+    def prepare_overlay(self, surface):
+        # Match the display's pixel format once so every later blit is a straight copy
+        if pygame.display.get_surface() is not None:
+            return surface.convert_alpha()
+        return surface
+
+    def build_hud(self):
+        # Only re-rendered when a planner runs, not every frame
+        # Two 12px rows fit between the slider knobs and the panel's bottom edge
+        hud = pygame.Surface((self.WIDTH - 40, 24), pygame.SRCALPHA)
+        font = self.get_font(16)
+        names = {'ai': "A*", 'dijkstra': "Dijkstra"}
+        for row, agent in enumerate(self.AGENTS):
+            stats = self.planner_stats.get(agent)
+            if stats is None:
+                continue
+            text = (f"{names[agent]}: {stats.planner}  {stats.ms:.2f} ms  exp {stats.expanded}  "
+                    f"push {stats.pushes}  pop {stats.pops}  peak {stats.peak_open}")
+            hud.blit(font.render(text, True, self.COLORS['BLACK']), (0, row * 12))
+        return self.prepare_overlay(hud)
 
     def draw_celebrations(self):
+        if self.confetti is None:
+            self.confetti = [self.Confetti() for _ in range(150)]
+        if self.celebration_surface is None:
+            self.celebration_surface = self.prepare_overlay(
+                pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA))
+        
         for c in self.confetti:
             c.update()
             c.draw(self.screen)
@@ -562,8 +1381,11 @@ class MazeGame:
             if particle.lifetime <= 0:
                 self.particles.remove(particle)
         
+        # The backdrop is only refilled while its fade-in alpha is still changing
         self.celebration_alpha = min(200, self.celebration_alpha + 3)
-        self.celebration_surface.fill((255, 255, 255, self.celebration_alpha))
+        if self.celebration_surface_alpha != self.celebration_alpha:
+            self.celebration_surface.fill((255, 255, 255, self.celebration_alpha))
+            self.celebration_surface_alpha = self.celebration_alpha
         self.screen.blit(self.celebration_surface, (0, 0))
         
         text = "VICTORY!"
@@ -571,19 +1393,19 @@ class MazeGame:
         base_x = self.WIDTH//2 - text_width//2
         
         for i, char in enumerate(text):
-            hue = (pygame.time.get_ticks() // 50 + i * 30) % 360
+            hue = (self.ticks() // 50 + i * 30) % 360
             color = pygame.Color(0, 0, 0)
             color.hsva = (hue, 100, 100, 100)
-            bounce = math.sin(pygame.time.get_ticks() / 200 + i) * 15
+            bounce = math.sin(self.ticks() / 200 + i) * 15
             char_surf = self.font_large.render(char, True, color)
             self.screen.blit(char_surf, (base_x + i * 70, self.HEIGHT//2 - 100 + bounce))
         
-        pulse = math.sin(pygame.time.get_ticks() / 200) * 30 + 155
+        pulse = math.sin(self.ticks() / 200) * 30 + 155
         restart_text = self.font_medium.render("Press R to restart", True, (pulse, pulse, pulse))
         restart_rect = restart_text.get_rect(center=(self.WIDTH//2, self.HEIGHT//2 + 100))
         self.screen.blit(restart_text, restart_rect)
 
-    def draw_help(self):
+    def build_help_overlay(self):
         help_surface = pygame.Surface((self.WIDTH-100, self.HEIGHT-100), pygame.SRCALPHA)
         help_surface.fill((0, 0, 0, 220))
         pygame.draw.rect(help_surface, self.COLORS['WHITE'], 
@@ -597,6 +1419,8 @@ class MazeGame:
             "Click/Tap: Move toward clicked position",
             "Move AI Button/Space: Move A* AI (yellow) one step",
             "Undo AI Button/Shift+Space: Undo A* AI's last move",
+            "Ctrl+Space / Ctrl+D: Redo an undone A* / Dijkstra move",
+            "Shift/Ctrl+U, Shift/Ctrl+J: A* / Dijkstra back/forward 10 moves",
             "Move Dijkstra Button: Move Dijkstra AI (orange) one step",
             "Undo Dijkstra Button: Undo Dijkstra AI's last move",
             "Auto AI Button: Toggle continuous A* AI movement",
@@ -605,7 +1429,11 @@ class MazeGame:
             "Speed Slider: Adjust game speed",
             "Maze Size Slider: Change maze complexity",
             "",
-            "Reach the blue goal to win!",
+            "Roads are quick to cross; mud and water slow everyone down",
+            "G: Cycle between 1 and 3 goals per maze",
+            "F: Toggle fog of war (everyone sees only nearby cells)",
+            "P / Shift+P: Switch the A* / Dijkstra AI's planner",
+            "Reach a blue goal to win!",
             "",
             "Press H to close this help"
         ]
@@ -614,7 +1442,12 @@ class MazeGame:
             text = self.font_small.render(line, True, self.COLORS['WHITE'])
             help_surface.blit(text, (20, 70 + i*30))
         
-        self.screen.blit(help_surface, (50, 50))
+        return self.prepare_overlay(help_surface)
+
+    def draw_help(self):
+        if self.help_overlay is None:
+            self.help_overlay = self.build_help_overlay()
+        self.screen.blit(self.help_overlay, (50, 50))
 
     def handle_click(self, pos):
         if pos[1] < self.MAZE_OFFSET_Y:
@@ -627,109 +1460,215 @@ class MazeGame:
             0 <= grid_y < self.ROWS and 
             self.maze[grid_y][grid_x] == 0):
             
-            path = self.a_star(self.player, (grid_x, grid_y))
+            terrain = None
+            if self.fog:
+                # Only route through cells the player has already seen
+                explored = self.player_view.explored
+                if not explored[grid_y * self.COLS + grid_x]:
+                    return
+                terrain = array('B', (cost if seen else 0 for cost, seen in zip(self.terrain, explored)))
+            path = self.a_star(self.player, (grid_x, grid_y), terrain)
             if path and len(path) > 0:
                 dx = path[0][0] - self.player[0]
                 dy = path[0][1] - self.player[1]
                 self.move_player(dx, dy)
 
-    def handle_events(self):
+    def handle_events(self, events=None):
         mouse_pos = pygame.mouse.get_pos()
 
         # Check hover for all buttons
-        self.move_ai_button.check_hover(mouse_pos)
-        self.undo_ai_button.check_hover(mouse_pos)
-        self.auto_ai_button.check_hover(mouse_pos)
-        self.reset_button.check_hover(mouse_pos)
-        self.move_dijkstra_button.check_hover(mouse_pos)
-        self.undo_dijkstra_button.check_hover(mouse_pos)
-        self.auto_dijkstra_button.check_hover(mouse_pos)
-        self.help_button.check_hover(mouse_pos)
-            
-        for event in pygame.event.get():
+        for button in self.buttons:
+            button.check_hover(mouse_pos)
+            
+        if events is None:
+            events = pygame.event.get()
+            
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
             
             # Button handling
             if self.move_ai_button.is_clicked(mouse_pos, event) and not self.game_over:
-                self.move_ai()
+                self.apply_action('move_ai')
             if self.undo_ai_button.is_clicked(mouse_pos, event) and not self.game_over:
-                self.undo_ai_move()
+                self.apply_action('undo_ai')
             if self.move_dijkstra_button.is_clicked(mouse_pos, event) and not self.game_over:
-                self.move_dijkstra()
+                self.apply_action('move_dijkstra')
             if self.undo_dijkstra_button.is_clicked(mouse_pos, event) and not self.game_over:
-                self.undo_dijkstra_move()
+                self.apply_action('undo_dijkstra')
             if self.reset_button.is_clicked(mouse_pos, event):
-                self.reset_game()
+                self.apply_action('reset')
             if self.help_button.is_clicked(mouse_pos, event):
-                self.show_help = not self.show_help
+                self.apply_action('toggle_help')
             if self.auto_ai_button.is_clicked(mouse_pos, event):
-                self.auto_ai = not self.auto_ai
-                self.auto_ai_timer = 0
+                self.apply_action('toggle_auto_ai')
             if self.auto_dijkstra_button.is_clicked(mouse_pos, event):
-                self.auto_dijkstra = not self.auto_dijkstra
-                self.auto_dijkstra_timer = 0
+                self.apply_action('toggle_auto_dijkstra')
             
             # Slider handling
-            if self.speed_slider.handle_event(event):
-                pass
+            old_speed = self.speed_slider.value
+            if self.speed_slider.handle_event(event) and self.speed_slider.value != old_speed:
+                self.apply_action('speed', round(self.speed_slider.value * 1000))
             if self.maze_size_slider.handle_event(event):
                 new_size = int(self.maze_size_slider.value)
                 if new_size != self.ROWS:
-                    self.ROWS = self.COLS = new_size
-                    self.CELL_SIZE = min(30, 600 // self.ROWS)
-                    self.reset_game()
+                    self.apply_action('resize', new_size)
             
             if event.type == pygame.MOUSEBUTTONUP and event.button == 1 and not self.show_help:
-                self.handle_click(mouse_pos)
+                self.apply_action('click', *mouse_pos)
             
             if event.type == pygame.KEYDOWN and not self.show_help:
                 if event.key == pygame.K_UP and not self.game_over:
-                    self.move_player(0, -1)
+                    self.apply_action('move_player', 0, -1)
                 elif event.key == pygame.K_DOWN and not self.game_over:
-                    self.move_player(0, 1)
+                    self.apply_action('move_player', 0, 1)
                 elif event.key == pygame.K_LEFT and not self.game_over:
-                    self.move_player(-1, 0)
+                    self.apply_action('move_player', -1, 0)
                 elif event.key == pygame.K_RIGHT and not self.game_over:
-                    self.move_player(1, 0)
+                    self.apply_action('move_player', 1, 0)
                 elif event.key == pygame.K_SPACE and not self.game_over:
                     if pygame.key.get_mods() & pygame.KMOD_SHIFT:
-                        self.undo_ai_move()
+                        self.apply_action('undo_ai')
+                    elif pygame.key.get_mods() & pygame.KMOD_CTRL:
+                        self.apply_action('redo_ai')
                     else:
-                        self.move_ai()
+                        self.apply_action('move_ai')
                 elif event.key == pygame.K_d and not self.game_over:
                     if pygame.key.get_mods() & pygame.KMOD_SHIFT:
-                        self.undo_dijkstra_move()
+                        self.apply_action('undo_dijkstra')
+                    elif pygame.key.get_mods() & pygame.KMOD_CTRL:
+                        self.apply_action('redo_dijkstra')
                     else:
-                        self.move_dijkstra()
+                        self.apply_action('move_dijkstra')
+                elif event.key in (pygame.K_u, pygame.K_j) and not self.game_over:
+                    agent = 'ai' if event.key == pygame.K_u else 'dijkstra'
+                    if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                        self.apply_action('undo_' + agent, self.HISTORY_JUMP)
+                    elif pygame.key.get_mods() & pygame.KMOD_CTRL:
+                        self.apply_action('redo_' + agent, self.HISTORY_JUMP)
                 elif event.key == pygame.K_r and self.game_over:
-                    self.reset_game()
+                    self.apply_action('reset')
                 elif event.key == pygame.K_h:
-                    self.show_help = not self.show_help
+                    self.apply_action('toggle_help')
+                elif event.key == pygame.K_g:
+                    self.apply_action('goals', self.goal_count % 3 + 1)
+                elif event.key == pygame.K_f:
+                    self.apply_action('toggle_fog')
+                elif event.key == pygame.K_p:
+                    agent = 1 if pygame.key.get_mods() & pygame.KMOD_SHIFT else 0
+                    self.apply_action('planner', agent, self.next_planner(self.AGENTS[agent]))
                 elif event.key == pygame.K_a:
-                    self.auto_ai = not self.auto_ai
-                    self.auto_ai_timer = 0
+                    self.apply_action('toggle_auto_ai')
                 elif event.key == pygame.K_s:
-                    self.auto_dijkstra = not self.auto_dijkstra
-                    self.auto_dijkstra_timer = 0
+                    self.apply_action('toggle_auto_dijkstra')
         
         return True
 
+    def apply_action(self, action, a=0, b=0):
+        # Single entry point for input, shared by live play and session replay
+        if self.recorder is not None:
+            self.recorder.record(self.frame, self.ACTIONS.index(action), a, b)
+        
+        if action == 'move_player':
+            self.move_player(a, b)
+        elif action == 'click':
+            self.handle_click((a, b))
+        elif action == 'move_ai':
+            self.move_ai()
+        elif action == 'undo_ai':
+            # a is the number of moves; 0 (buttons, older recordings) means one
+            self.undo_ai_move(a or 1)
+        elif action == 'redo_ai':
+            self.redo_ai_move(a or 1)
+        elif action == 'move_dijkstra':
+            self.move_dijkstra()
+        elif action == 'undo_dijkstra':
+            self.undo_dijkstra_move(a or 1)
+        elif action == 'redo_dijkstra':
+            self.redo_dijkstra_move(a or 1)
+        elif action == 'toggle_auto_ai':
+            self.auto_ai = not self.auto_ai
+            self.auto_ai_timer = 0
+        elif action == 'toggle_auto_dijkstra':
+            self.auto_dijkstra = not self.auto_dijkstra
+            self.auto_dijkstra_timer = 0
+        elif action == 'toggle_help':
+            self.show_help = not self.show_help
+        elif action == 'reset':
+            self.reset_game()
+        elif action == 'resize':
+            self.ROWS = self.COLS = a
+            self.CELL_SIZE = min(30, 600 // self.ROWS)
+            self.reset_game()
+        elif action == 'goals':
+            self.goal_count = a
+            self.reset_game()
+        elif action == 'toggle_fog':
+            self.fog = not self.fog
+            if self.fog:
+                self.init_fog()
+            if self.agents_planned:
+                self.ai_path = self.plan_ai_path(self.ai_position)
+                self.dijkstra_path = self.plan_dijkstra_path(self.dijkstra_position)
+        elif action == 'planner':
+            self.set_planner(self.AGENTS[a], list(self.PLANNERS)[b])
+        elif action == 'speed':
+            # Speed is quantized so live play and replays see the same value
+            self.speed_slider.value = a / 1000
+            self.speed_slider.update_knob()
+
+    def state_bytes(self):
+        # Everything the game logic depends on, packed for exact replay comparison
+        self.plan_agents()
+        def cell(pos):
+            return pos[1] * self.COLS + pos[0]
+        
+        state = bytearray(struct.pack('<QHHIBB', self.seed, self.ROWS, self.COLS, self.frame,
+                                      self.goal_count, self.fog))
+        if self.fog:
+            for view in (self.player_view, self.ai_view, self.dijkstra_view):
+                state += view.explored
+        state += ','.join(self.agent_planners[agent] for agent in self.AGENTS).encode() + b'\0'
+        for row in self.maze:
+            state += bytes(row)
+        state += self.terrain.tobytes()
+        for pos in (self.player, self.player_prev, self.player_target,
+                    self.ai_position, self.ai_prev, self.ai_target,
+                    self.dijkstra_position, self.dijkstra_prev, self.dijkstra_target):
+            state += struct.pack('<I', cell(pos))
+        state += struct.pack('<7B', self.game_over, self.victory, self.auto_ai,
+                             self.auto_dijkstra, self.show_help, self.player_anim,
+                             self.player_cooldown)
+        state += struct.pack('<2B3d', self.ai_anim, self.dijkstra_anim, self.auto_ai_timer,
+                             self.auto_dijkstra_timer, self.speed_slider.value)
+        for history in (self.ai_history, self.dijkstra_history):
+            state += struct.pack('<II', history.cursor, len(history.log))
+            state += history.log.tobytes()
+        for path in (self.ai_path, self.dijkstra_path):
+            state += struct.pack('<I', len(path))
+            state += b''.join(struct.pack('<I', cell(pos)) for pos in path)
+        return bytes(state)
+
     def update(self):
         dt = 1/60  # Fixed delta time for simplicity
         
+        # An AI lingers on the cell it last entered in proportion to its terrain cost
+        step_interval = 1.0 / (self.speed_slider.value / 2)
         if self.auto_ai and not self.game_over:
             self.auto_ai_timer += dt
-            if self.auto_ai_timer > 1.0 / (self.speed_slider.value / 2):
+            if self.auto_ai_timer > step_interval * self.move_time(self.ai_position):
                 self.move_ai()
                 self.auto_ai_timer = 0
                 
         if self.auto_dijkstra and not self.game_over:
             self.auto_dijkstra_timer += dt
-            if self.auto_dijkstra_timer > 1.0 / (self.speed_slider.value / 2):
+            if self.auto_dijkstra_timer > step_interval * self.move_time(self.dijkstra_position):
                 self.move_dijkstra()
                 self.auto_dijkstra_timer = 0
         
+        if self.player_cooldown > 0:
+            self.player_cooldown -= 1
+        
         if self.player_anim > 0:
             self.player_anim -= 1
             
@@ -738,8 +1677,13 @@ class MazeGame:
             
         if self.dijkstra_anim > 0:
             self.dijkstra_anim -= 1
+        
+        self.frame += 1
 
     def draw(self):
+        if self.screen is None:
+            self.screen = pygame.Surface((self.WIDTH, self.HEIGHT))
+        
         # Background
         self.screen.fill(self.COLORS['DARK_GRAY'])
         
@@ -771,74 +1715,100 @@ class MazeGame:
             self.screen.blit(auto_text, (self.auto_dijkstra_button.rect.right + 10, 
                                        self.auto_dijkstra_button.rect.centery - 10))
         
+        # Planner HUD: the latest query of each AI
+        if self.planner_stats:
+            if self.hud_surface is None:
+                self.hud_surface = self.build_hud()
+            self.screen.blit(self.hud_surface, (20, 173))  # Just below the slider knobs
+        
         if not self.game_over:
             self.draw_maze()
             self.draw_trails()  # Draw the trails before the agents
             self.draw_path()
 
-            # Draw goal
-            goal_rect = pygame.Rect(
-                self.goal[0] * self.CELL_SIZE, 
-                self.goal[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y, 
-                self.CELL_SIZE, self.CELL_SIZE
-            )
-            pygame.draw.rect(self.screen, self.COLORS['BLUE'], goal_rect)
-            pulse_size = math.sin(pygame.time.get_ticks() / 500) * 3 + 1
-            pygame.draw.rect(
-                self.screen, (100, 200, 255), 
-                (goal_rect.x + pulse_size, goal_rect.y + pulse_size, 
-                 goal_rect.width - pulse_size*2, goal_rect.height - pulse_size*2)
-            )
+            # Draw goals
+            pulse_size = math.sin(self.ticks() / 500) * 3 + 1
+            for goal in self.goals:
+                goal_rect = pygame.Rect(
+                    goal[0] * self.CELL_SIZE, 
+                    goal[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y, 
+                    self.CELL_SIZE, self.CELL_SIZE
+                )
+                pygame.draw.rect(self.screen, self.COLORS['BLUE'], goal_rect)
+                pygame.draw.rect(
+                    self.screen, (100, 200, 255), 
+                    (goal_rect.x + pulse_size, goal_rect.y + pulse_size, 
+                     goal_rect.width - pulse_size*2, goal_rect.height - pulse_size*2)
+                )
             
-            # Draw A* AI with animation
-            if self.ai_anim > 0:
-                progress = 1 - (self.ai_anim / 10)
-                anim_x = (self.ai_prev[0] * self.CELL_SIZE + 
-                         (self.ai_target[0] - self.ai_prev[0]) * self.CELL_SIZE * progress)
-                anim_y = (self.ai_prev[1] * self.CELL_SIZE + 
-                         (self.ai_target[1] - self.ai_prev[1]) * self.CELL_SIZE * progress + 
-                         self.MAZE_OFFSET_Y)
-            else:
-                anim_x = self.ai_position[0] * self.CELL_SIZE
-                anim_y = self.ai_position[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y
+            # Fog of war hides what the player has not seen; the AIs only show in sight
+            if self.fog:
+                if self.fog_layer is None:
+                    self.fog_layer = self.build_fog_layer()
+                self.screen.blit(self.fog_layer, (0, self.MAZE_OFFSET_Y))
             
-            # A* AI shadow
-            pygame.draw.rect(
-                self.screen, (50, 50, 50), 
-                (anim_x + 3, anim_y + 3, self.CELL_SIZE, self.CELL_SIZE), 
-                border_radius=3
-            )
-            # A* AI
-            pygame.draw.rect(
-                self.screen, self.COLORS['YELLOW'], 
-                (anim_x, anim_y, self.CELL_SIZE, self.CELL_SIZE), 
-                border_radius=3
-            )
+            if self.visible_to_player(self.ai_position):
+                # Draw A* AI with animation
+                if self.ai_anim > 0:
+                    progress = 1 - (self.ai_anim / 10)
+                    anim_x = (self.ai_prev[0] * self.CELL_SIZE + 
+                             (self.ai_target[0] - self.ai_prev[0]) * self.CELL_SIZE * progress)
+                    anim_y = (self.ai_prev[1] * self.CELL_SIZE + 
+                             (self.ai_target[1] - self.ai_prev[1]) * self.CELL_SIZE * progress + 
+                             self.MAZE_OFFSET_Y)
+                else:
+                    anim_x = self.ai_position[0] * self.CELL_SIZE
+                    anim_y = self.ai_position[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y
             
-            # Draw Dijkstra's AI with animation
-            if self.dijkstra_anim > 0:
-                progress = 1 - (self.dijkstra_anim / 10)
-                anim_x = (self.dijkstra_prev[0] * self.CELL_SIZE + 
-                         (self.dijkstra_target[0] - self.dijkstra_prev[0]) * self.CELL_SIZE * progress)
-                anim_y = (self.dijkstra_prev[1] * self.CELL_SIZE + 
-                         (self.dijkstra_target[1] - self.dijkstra_prev[1]) * self.CELL_SIZE * progress + 
-                         self.MAZE_OFFSET_Y)
-            else:
-                anim_x = self.dijkstra_position[0] * self.CELL_SIZE
-                anim_y = self.dijkstra_position[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y
+                # A* AI shadow
+                pygame.draw.rect(
+                    self.screen, (50, 50, 50), 
+                    (anim_x + 3, anim_y + 3, self.CELL_SIZE, self.CELL_SIZE), 
+                    border_radius=3
+                )
+                # A* AI
+                pygame.draw.rect(
+                    self.screen, self.COLORS['YELLOW'], 
+                    (anim_x, anim_y, self.CELL_SIZE, self.CELL_SIZE), 
+                    border_radius=3
+                )
             
-            # Dijkstra's AI shadow
-            pygame.draw.rect(
-                self.screen, (50, 50, 50), 
-                (anim_x + 3, anim_y + 3, self.CELL_SIZE, self.CELL_SIZE), 
-                border_radius=3
-            )
-            # Dijkstra's AI
-            pygame.draw.rect(
-                self.screen, self.COLORS['ORANGE'], 
-                (anim_x, anim_y, self.CELL_SIZE, self.CELL_SIZE), 
-                border_radius=3
-            )
+            if self.visible_to_player(self.dijkstra_position):
+                # Draw Dijkstra's AI with animation
+                if self.dijkstra_anim > 0:
+                    progress = 1 - (self.dijkstra_anim / 10)
+                    anim_x = (self.dijkstra_prev[0] * self.CELL_SIZE + 
+                             (self.dijkstra_target[0] - self.dijkstra_prev[0]) * self.CELL_SIZE * progress)
+                    anim_y = (self.dijkstra_prev[1] * self.CELL_SIZE + 
+                             (self.dijkstra_target[1] - self.dijkstra_prev[1]) * self.CELL_SIZE * progress + 
+                             self.MAZE_OFFSET_Y)
+                else:
+                    anim_x = self.dijkstra_position[0] * self.CELL_SIZE
+                    anim_y = self.dijkstra_position[1] * self.CELL_SIZE + self.MAZE_OFFSET_Y
+            
+                # Dijkstra's AI shadow
+                pygame.draw.rect(
+                    self.screen, (50, 50, 50), 
+                    (anim_x + 3, anim_y + 3, self.CELL_SIZE, self.CELL_SIZE), 
+                    border_radius=3
+                )
+                # Dijkstra's AI
+                pygame.draw.rect(
+                    self.screen, self.COLORS['ORANGE'], 
+                    (anim_x, anim_y, self.CELL_SIZE, self.CELL_SIZE), 
+                    border_radius=3
+                )
+            
+            # Other players in a multiplayer session
+            for x, y in self.remote_players.values():
+                if not self.visible_to_player((x, y)):
+                    continue
+                pygame.draw.circle(
+                    self.screen, self.COLORS['PURPLE'], 
+                    (x * self.CELL_SIZE + self.CELL_SIZE // 2, 
+                     y * self.CELL_SIZE + self.MAZE_OFFSET_Y + self.CELL_SIZE // 2), 
+                    self.CELL_SIZE // 3
+                )
             
             # Draw player with animation
             if self.player_anim > 0:
@@ -898,7 +1868,7 @@ class MazeGame:
                     collision_y = collision_y // collision_count
                     
                     # Draw pulsing collision indicator
-                    radius = math.sin(pygame.time.get_ticks() / 200) * 5 + 15
+                    radius = math.sin(self.ticks() / 200) * 5 + 15
                     pygame.draw.circle(
                         self.screen, self.COLORS['GREEN'], 
                         (int(collision_x), int(collision_y)), 
@@ -906,9 +1876,11 @@ class MazeGame:
                     )
         else:
             # Darken the maze in background
-            darken = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
-            darken.fill((0, 0, 0, 150))
-            self.screen.blit(darken, (0, 0))
+            if self.darken_overlay is None:
+                darken = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
+                darken.fill((0, 0, 0, 150))
+                self.darken_overlay = self.prepare_overlay(darken)
+            self.screen.blit(self.darken_overlay, (0, 0))
         
         if self.game_over and self.victory:
             self.draw_celebrations()
@@ -916,21 +1888,103 @@ class MazeGame:
         if self.show_help:
             self.draw_help()
 
-        pygame.display.flip()
+        if not self.headless:
+            pygame.display.flip()
 
-    def run(self):
+    def is_idle(self):
+        # True when nothing on screen will change until the next input event
+        if self.game_over and self.victory:
+            return False
+        if (self.auto_ai or self.auto_dijkstra) and not self.game_over:
+            return False
+        if self.player_anim > 0 or self.ai_anim > 0 or self.dijkstra_anim > 0:
+            return False
+        if self.player_cooldown > 0:
+            return False  # Frames must keep ticking for the player to move again
+        if self.particles:
+            return False
+        if self.speed_slider.dragging or self.maze_size_slider.dragging:
+            return False
+        return not any(button.is_animating() for button in self.buttons)
+
+    def run(self, startup_report=False):
         clock = pygame.time.Clock()
         running = True
         
+        # Put the first frame on screen before the agents' searches run
+        self.draw()
+        self.mark_startup("first frame")
+        self.plan_agents()
+        self.mark_startup("planning")
+        if startup_report:
+            self.print_startup_report()
+        
         while running:
-            running = self.handle_events()
+            events = None
+            if self.is_idle():
+                # Block until input or a timer arrives instead of spinning at 60 FPS.
+                # The timeout keeps the goal pulse ticking over at a low rate.
+                event = pygame.event.wait(self.IDLE_TIMEOUT_MS)
+                events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+            running = self.handle_events(events)
             self.update()
             self.draw()
             clock.tick(60)
 
+# Built-in planners. Plugins register theirs the same way, e.g. from a module
+# loaded with --plugin.
+MazeGame.register_planner('a_star', MazeGame.a_star)
+MazeGame.register_planner('dijkstra', MazeGame.dijkstra)
+MazeGame.register_planner('goal_field', MazeGame.field_planner)
+MazeGame.register_planner('dijkstra_heap', MazeGame.dijkstra_heap)
+
+@MazeGame.register_planner('a_star_manhattan')
+def a_star_manhattan(game, start, end, terrain=None, stats=None):
+    # A* without landmarks, for comparison
+    return game.a_star(start, end, terrain, game.heuristic, stats)
+
 # Run the game
 if __name__ == "__main__":
-    game = MazeGame()
-    game.run()
+    parser = argparse.ArgumentParser(description="Interactive Maze Game")
+    parser.add_argument("--seed", type=int, help="seed for maze generation")
+    parser.add_argument("--size", type=int, default=20, choices=range(10, 31), metavar="10-30",
+                        help="starting maze size")
+    parser.add_argument("--record", metavar="FILE", help="record the session for session_replay.py")
+    parser.add_argument("--startup-report", action="store_true", help="print where startup time goes")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                        help="import a module that registers extra planners")
+    parser.add_argument("--ai-planner", default='a_star', help="planner for the A* AI")
+    parser.add_argument("--dijkstra-planner", default='goal_field', help="planner for the Dijkstra AI")
+    parser.add_argument("--metrics", metavar="FILE", help="write every planner query as a JSON line")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="build ALT landmark tables for A* on every maze")
+    args = parser.parse_args()
+    
+    # Plugins import Maze_Game; make that this module rather than a second copy
+    # with its own PLANNERS
+    sys.modules.setdefault('Maze_Game', sys.modules['__main__'])
+    for module in args.plugin:
+        importlib.import_module(module)
+    for name in (args.ai_planner, args.dijkstra_planner):
+        if name not in MazeGame.PLANNERS:
+            parser.error(f"unknown planner {name!r} (choose from {', '.join(MazeGame.PLANNERS)})")
+    
+    game = MazeGame(seed=args.seed, size=args.size)
+    game.use_landmarks = args.landmarks
+    if args.metrics:
+        metrics = open(args.metrics, 'w')
+        game.metrics_listeners.append(lambda stats: metrics.write(json.dumps(stats.as_dict()) + '\n'))
+    if args.record:
+        from session_replay import SessionRecorder
+        game.recorder = SessionRecorder(game.seed, game.ROWS)
+    # Chosen through apply_action so recordings replay with the same planners
+    for agent, name in enumerate((args.ai_planner, args.dijkstra_planner)):
+        if name != game.agent_planners[MazeGame.AGENTS[agent]]:
+            game.apply_action('planner', agent, list(MazeGame.PLANNERS).index(name))
+    game.run(startup_report=args.startup_report)
+    if args.record:
+        game.recorder.save(args.record, game)
+    if args.metrics:
+        metrics.close()
     pygame.quit()
     sys.exit()
\ No newline at end of file
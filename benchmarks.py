@@ -0,0 +1,230 @@
+# Pathfinding benchmarks on large headless mazes.
+#
+#   python benchmarks.py terrain --sizes 101 201 401 --repeat 5
+#   python benchmarks.py goals --size 201 --agents 1 10 100
+#   python benchmarks.py landmarks --sizes 101 201 --braid 0 0.1 --queries 50
+#   python benchmarks.py planners --size 101 --queries 50 --metrics planners.jsonl
+import argparse
+import importlib
+import json
+import random
+import sys
+import time
+
+from Maze_Game import MazeGame, pygame
+
+
+def make_game(size, seed):
+    # The same maze MazeGame(seed=seed, size=size) starts a player on
+    return MazeGame(seed=seed, headless=True, size=size)
+
+
+def time_query(search, start, end, repeat):
+    # Best of several runs, in milliseconds, plus the path from the last run
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        path = search(start, end)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, path
+
+
+def bench_terrain(args):
+    print(f"{'size':>6} {'search':<14} {'best ms':>9} {'cost':>7} {'steps':>6}")
+    for size in args.sizes:
+        game = make_game(size, args.seed)
+        searches = [
+            ('dijkstra_heap', game.dijkstra_heap),
+            ('dijkstra', game.dijkstra),
+            ('a_star', game.a_star),
+        ]
+        costs = set()
+        for name, search in searches:
+            ms, path = time_query(search, game.start, game.goal, args.repeat)
+            cost = game.path_cost(path)
+            costs.add(cost)
+            print(f"{size:>6} {name:<14} {ms:>9.2f} {cost:>7} {len(path):>6}")
+        if len(costs) != 1:
+            print(f"error: searches disagree on the optimal cost for size {size}", file=sys.stderr)
+            return 1
+    return 0
+
+
+def bench_goals(args):
+    # Routing N agents from one shared goal field vs one A* search per agent
+    game = make_game(args.size, args.seed)
+    game.goal_count = 3
+    game.reset_game()
+    game.plan_agents()
+    rng = random.Random(args.seed)
+    open_cells = [(x, y) for y in range(game.ROWS) for x in range(game.COLS) if game.maze[y][x] == 0]
+
+    t0 = time.perf_counter()
+    game.goal_field(game.goals)
+    field_ms = (time.perf_counter() - t0) * 1000
+    print(f"goal field for {len(game.goals)} goals on {args.size}x{args.size}: {field_ms:.2f} ms")
+
+    print(f"{'agents':>7} {'field ms':>10} {'a_star ms':>10}")
+    for count in args.agents:
+        agents = [rng.choice(open_cells) for _ in range(count)]
+        t0 = time.perf_counter()
+        for pos in agents:
+            game.field_path(pos)
+        routed_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        for pos in agents:
+            game.a_star(pos, game.nearest_goal(pos))
+        searched_ms = (time.perf_counter() - t0) * 1000
+        print(f"{count:>7} {field_ms + routed_ms:>10.2f} {searched_ms:>10.2f}")
+    return 0
+
+
+def braid(game, fraction, rng):
+    # Knocks out a fraction of the walls that separate two open cells, adding loops
+    cols = game.COLS
+    opened = 0
+    for y in range(1, game.ROWS - 1):
+        for x in range(1, cols - 1):
+            if game.maze[y][x] == 0 or rng.random() >= fraction:
+                continue
+            if ((game.maze[y][x - 1] == 0 and game.maze[y][x + 1] == 0) or
+                    (game.maze[y - 1][x] == 0 and game.maze[y + 1][x] == 0)):
+                game.maze[y][x] = 0
+                game.terrain[y * cols + x] = game.TERRAIN['Background']
+                opened += 1
+    return opened
+
+
+def bench_landmarks(args):
+    # A* with Manhattan vs ALT (landmark) lower bounds on the same random queries
+    print(f"{'size':>6} {'braid':>6} {'heuristic':<10} {'expanded':>9} {'mean ms':>8} {'table':>10}")
+    for size in args.sizes:
+        for fraction in args.braid:
+            game = make_game(size, args.seed)
+            rng = random.Random(args.seed)
+            braid(game, fraction, rng)
+            open_cells = [(x, y) for y in range(size) for x in range(size) if game.maze[y][x] == 0]
+            queries = [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(args.queries)]
+
+            t0 = time.perf_counter()
+            landmarks = game.build_landmarks(args.landmarks)
+            build_ms = (time.perf_counter() - t0) * 1000
+            game.landmarks = landmarks
+            table = f"{landmarks.nbytes() // 1024} KiB"
+
+            costs = {}
+            for name, heuristic in (('manhattan', game.heuristic), ('alt', game.landmark_heuristic)):
+                stats = MazeGame.SearchStats(name)
+                t0 = time.perf_counter()
+                for start, end in queries:
+                    path = game.a_star(start, end, heuristic=heuristic, stats=stats)
+                    costs.setdefault((start, end), set()).add(game.path_cost(path))
+                ms = (time.perf_counter() - t0) * 1000 / len(queries)
+                print(f"{size:>6} {fraction:>6.2f} {name:<10} {stats.expanded / len(queries):>9.0f} "
+                      f"{ms:>8.2f} {table if name == 'alt' else '':>10}")
+            print(f"{'':>6} {'':>6} {'(build)':<10} {'':>9} {build_ms:>8.2f} "
+                  f"{len(landmarks.cells):>4} marks")
+
+            if any(len(found) != 1 for found in costs.values()):
+                print(f"error: heuristics disagree on an optimal cost for size {size}", file=sys.stderr)
+                return 1
+    return 0
+
+
+def bench_planners(args):
+    # Every registered planner on the same queries to the same goal, through
+    # run_planner so the numbers match what the game's HUD and --metrics report
+    for module in args.plugin:
+        importlib.import_module(module)
+    names = args.planners or list(MazeGame.PLANNERS)
+    unknown = [name for name in names if name not in MazeGame.PLANNERS]
+    if unknown:
+        print(f"error: unknown planners {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    game = make_game(args.size, args.seed)
+    game.plan_agents()
+    rng = random.Random(args.seed)
+    braid(game, args.braid, rng)
+    if args.braid:
+        # The goal field was computed before the new loops existed
+        game.goal_dist, game.goal_label, game.goal_next = game.goal_field(game.goals)
+    # Many queries per maze is where landmarks pay off, so a_star gets them here
+    game.landmarks = game.build_landmarks()
+    open_cells = [(x, y) for y in range(game.ROWS) for x in range(game.COLS) if game.maze[y][x] == 0]
+    starts = [rng.choice(open_cells) for _ in range(args.queries)]
+
+    metrics = open(args.metrics, 'w') if args.metrics else None
+    results = []
+    game.metrics_listeners.append(results.append)
+    if metrics:
+        game.metrics_listeners.append(lambda stats: metrics.write(json.dumps(stats.as_dict()) + '\n'))
+
+    print(f"{'planner':<18} {'mean ms':>8} {'expanded':>9} {'pushes':>8} {'pops':>8} {'peak':>6} {'cost':>6}")
+    costs = {}
+    for name in names:
+        del results[:]
+        for start in starts:
+            game.run_planner(name, start, game.goal, agent='bench')
+        for start, stats in zip(starts, results):
+            costs.setdefault(start, set()).add(stats.cost)
+        count = len(results)
+        print(f"{name:<18} {sum(s.ms for s in results) / count:>8.2f} "
+              f"{sum(s.expanded for s in results) / count:>9.0f} "
+              f"{sum(s.pushes for s in results) / count:>8.0f} "
+              f"{sum(s.pops for s in results) / count:>8.0f} "
+              f"{max(s.peak_open for s in results):>6} "
+              f"{sum(s.cost for s in results) / count:>6.0f}")
+    if metrics:
+        metrics.close()
+
+    if any(len(found) != 1 for found in costs.values()):
+        print("error: planners disagree on an optimal cost", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maze game pathfinding benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    terrain = commands.add_parser('terrain', help="bucket-queue vs heap Dijkstra on weighted mazes")
+    terrain.add_argument('--sizes', type=int, nargs='+', default=[101, 201, 401])
+    terrain.add_argument('--repeat', type=int, default=5)
+    terrain.add_argument('--seed', type=int, default=1)
+    terrain.set_defaults(run=bench_terrain)
+
+    goals = commands.add_parser('goals', help="shared multi-goal field vs per-agent A*")
+    goals.add_argument('--size', type=int, default=201)
+    goals.add_argument('--agents', type=int, nargs='+', default=[1, 10, 100])
+    goals.add_argument('--seed', type=int, default=1)
+    goals.set_defaults(run=bench_goals)
+
+    landmarks = commands.add_parser('landmarks', help="ALT landmark bounds vs Manhattan for A*")
+    landmarks.add_argument('--sizes', type=int, nargs='+', default=[101, 201])
+    landmarks.add_argument('--braid', type=float, nargs='+', default=[0.0, 0.1],
+                           help="fractions of separating walls to remove (adds loops)")
+    landmarks.add_argument('--landmarks', type=int, default=4)
+    landmarks.add_argument('--queries', type=int, default=50)
+    landmarks.add_argument('--seed', type=int, default=1)
+    landmarks.set_defaults(run=bench_landmarks)
+
+    planners = commands.add_parser('planners', help="every registered planner on identical queries")
+    planners.add_argument('--size', type=int, default=101)
+    planners.add_argument('--planners', nargs='+', help="names to compare (default: all)")
+    planners.add_argument('--plugin', action='append', default=[], metavar='MODULE',
+                          help="import a module that registers extra planners")
+    planners.add_argument('--braid', type=float, default=0.0)
+    planners.add_argument('--queries', type=int, default=50)
+    planners.add_argument('--metrics', metavar='FILE', help="also write every query as a JSON line")
+    planners.add_argument('--seed', type=int, default=1)
+    planners.set_defaults(run=bench_planners)
+
+    args = parser.parse_args()
+    status = args.run(args)
+    pygame.quit()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# Batch maze analytics and difficulty-targeted maze generation.
+#
+# Metrics are computed with NumPy over a whole stack of mazes at once, shaped
+# (count, rows, cols) with 1 = wall and 0 = open like MazeGame.maze, so a
+# thousand mazes cost a few hundred array operations instead of a thousand
+# Python searches. Terrain costs are ignored; these measure maze topology.
+#
+#   python maze_analytics.py --size 20 --count 200 --band 0.47 0.52 --workers 4
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from Maze_Game import MazeGame
+
+
+def open_neighbors(open_cells):
+    # Number of open 4-neighbors of every cell
+    padded = np.pad(open_cells, ((0, 0), (1, 1), (1, 1))).astype(np.uint8)
+    return (padded[:, :-2, 1:-1] + padded[:, 2:, 1:-1] +
+            padded[:, 1:-1, :-2] + padded[:, 1:-1, 2:])
+
+
+def dilate(mask):
+    grown = mask.copy()
+    grown[:, 1:, :] |= mask[:, :-1, :]
+    grown[:, :-1, :] |= mask[:, 1:, :]
+    grown[:, :, 1:] |= mask[:, :, :-1]
+    grown[:, :, :-1] |= mask[:, :, 1:]
+    return grown
+
+
+def bfs_distances(open_cells, source):
+    # Breadth-first step counts from one (x, y) cell in every maze at once,
+    # -1 where unreachable. One dilation per BFS layer across the whole batch.
+    x, y = source
+    dist = np.full(open_cells.shape, -1, dtype=np.int32)
+    frontier = np.zeros(open_cells.shape, dtype=bool)
+    frontier[:, y, x] = open_cells[:, y, x]
+    dist[frontier] = 0
+    reached = frontier.copy()
+    step = 0
+    while frontier.any():
+        step += 1
+        frontier = dilate(frontier) & open_cells & ~reached
+        dist[frontier] = step
+        reached |= frontier
+    return dist
+
+
+def corridor_histogram(open_cells):
+    # Counts of maximal straight runs of open cells (rows and columns) by length.
+    # Runs of length 1 are just the cross-section of a corridor and are dropped.
+    count, rows, cols = open_cells.shape
+    hist = np.zeros((count, max(rows, cols) + 1), dtype=np.int32)
+    for grid in (open_cells, open_cells.transpose(0, 2, 1)):
+        edges = np.diff(np.pad(grid, ((0, 0), (0, 0), (1, 1))).astype(np.int8), axis=2)
+        # nonzero walks in (maze, row, col) order, so starts and ends pair up
+        maze_index, _, starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)[2]
+        np.add.at(hist, (maze_index, ends - starts), 1)
+    hist[:, :2] = 0
+    return hist
+
+
+def analyze(grids, start=(0, 0), goal=None):
+    grids = np.asarray(grids)
+    count, rows, cols = grids.shape
+    gx, gy = goal if goal is not None else (cols - 1, rows - 1)
+    open_cells = grids == 0
+    open_count = open_cells.sum(axis=(1, 2))
+
+    degree = open_neighbors(open_cells)
+    dead_ends = (open_cells & (degree == 1)).sum(axis=(1, 2))
+    junctions = (open_cells & (degree >= 3)).sum(axis=(1, 2))
+    # Average number of onward choices at a junction (exits minus the way in)
+    at_junctions = np.where(open_cells & (degree >= 3), degree.astype(np.int16) - 1, 0)
+    branching_factor = at_junctions.sum(axis=(1, 2)) / np.maximum(junctions, 1)
+
+    dist = bfs_distances(open_cells, start)
+    solution_length = dist[:, gy, gx]
+
+    # A* with the Manhattan heuristic expands every cell with f = g + h below the
+    # optimal cost, and some of those equal to it; counting f <= C* gives the
+    # worst-case tie-breaking figure without running a search per maze.
+    ys, xs = np.mgrid[0:rows, 0:cols]
+    manhattan = np.abs(xs - gx) + np.abs(ys - gy)
+    f = dist + manhattan
+    astar_expanded = ((dist >= 0) & (f <= solution_length[:, None, None])).sum(axis=(1, 2))
+    solvable = solution_length > 0
+    expansion_ratio = np.where(solvable, astar_expanded / np.maximum(solution_length, 1), np.nan)
+
+    corridors = corridor_histogram(open_cells)
+    lengths = np.arange(corridors.shape[1])
+    mean_corridor = (corridors * lengths).sum(axis=1) / np.maximum(corridors.sum(axis=1), 1)
+
+    return {
+        'solution_length': solution_length,
+        'dead_ends': dead_ends,
+        'junctions': junctions,
+        'branching_factor': branching_factor,
+        'corridor_histogram': corridors,
+        'mean_corridor': mean_corridor,
+        'astar_expanded': astar_expanded,
+        'expansion_ratio': expansion_ratio,
+        'difficulty': difficulty(solution_length, open_count, astar_expanded),
+    }
+
+
+def difficulty(solution_length, open_count, astar_expanded):
+    # 0..1: half from how much of the maze the solution winds through, half from
+    # how much work A* wastes off the solution path. Unsolvable mazes score NaN.
+    solvable = solution_length > 0
+    coverage = solution_length / np.maximum(open_count, 1)
+    waste = 1 - solution_length / np.maximum(astar_expanded, 1)
+    return np.where(solvable, 0.5 * coverage + 0.5 * waste, np.nan)
+
+
+def generate_mazes(size, seeds):
+    # Same generator as the game: MazeGame(seed=s, size=size) starts on grids[i]
+    game = MazeGame(seed=0, headless=True, size=size)
+    grids = np.empty((len(seeds), size, size), dtype=np.uint8)
+    for i, seed in enumerate(seeds):
+        game.rng.seed(seed)
+        grids[i] = game.generate_maze()
+    return grids
+
+
+def generate_and_filter(size, seeds, low, high):
+    grids = generate_mazes(size, seeds)
+    scores = analyze(grids)['difficulty']
+    keep = (scores >= low) & (scores <= high)
+    return np.asarray(seeds)[keep], grids[keep], scores[keep]
+
+
+def generate_targeted(size, count, low, high, workers, chunk=256, first_seed=0,
+                      max_generated=None, max_seconds=None):
+    # Generates mazes in parallel, rejecting them until `count` fall inside the
+    # difficulty band or a limit on mazes generated or time spent is reached, in
+    # which case fewer are returned. Returns (seeds, grids, scores, mazes generated).
+    if low > high:
+        raise ValueError(f"empty difficulty band [{low}, {high}]")
+    accepted = []
+    found = generated = 0
+    next_seed = first_seed
+    deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while found < count:
+            if max_generated is not None and generated >= max_generated:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            # Keep every worker busy with one task queued behind it
+            while len(pending) < workers * 2:
+                seeds = list(range(next_seed, next_seed + chunk))
+                next_seed += chunk
+                pending.add(pool.submit(generate_and_filter, size, seeds, low, high))
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            finished, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                accepted.append(result)
+                found += len(result[0])
+                generated += chunk
+        for future in pending:
+            future.cancel()
+
+    if not accepted:
+        return (np.empty(0, dtype=np.int64), np.empty((0, size, size), dtype=np.uint8),
+                np.empty(0), generated)
+    seeds = np.concatenate([seeds for seeds, _, _ in accepted])[:count]
+    grids = np.concatenate([grids for _, grids, _ in accepted])[:count]
+    scores = np.concatenate([scores for _, _, scores in accepted])[:count]
+    return seeds, grids, scores, generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate mazes inside a difficulty band")
+    parser.add_argument('--size', type=int, default=20)
+    parser.add_argument('--count', type=int, default=100, help="mazes to accept")
+    parser.add_argument('--band', type=float, nargs=2, default=[0.47, 0.52], metavar=('LOW', 'HIGH'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=256, help="mazes per worker task")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--max-generated', type=int, default=1_000_000,
+                        help="give up after generating this many mazes")
+    parser.add_argument('--max-seconds', type=float, default=60.0,
+                        help="give up after this long")
+    parser.add_argument('--out', help="save accepted seeds, grids and scores to this .npz file")
+    args = parser.parse_args()
+
+    low, high = args.band
+    if not 0 <= low <= high <= 1:
+        parser.error(f"--band needs 0 <= LOW <= HIGH <= 1, got {low} {high}")
+    start = time.perf_counter()
+    seeds, grids, scores, generated = generate_targeted(
+        args.size, args.count, low, high, args.workers, args.chunk, args.first_seed,
+        args.max_generated, args.max_seconds)
+    elapsed = time.perf_counter() - start
+
+    print(f"generated {generated} mazes, accepted {len(seeds)} in [{low}, {high}] "
+          f"({len(seeds) / max(generated, 1):.1%}) in {elapsed:.2f} s")
+    print(f"throughput: {generated / elapsed:.0f} mazes/s generated and analysed, "
+          f"{len(seeds) / elapsed:.0f} mazes/s accepted")
+    if len(seeds) < args.count:
+        print(f"warning: stopped at the generation limit with {len(seeds)} of {args.count} "
+              f"mazes in the band", file=sys.stderr)
+
+    if len(seeds):
+        metrics = analyze(grids)
+        for name in ('difficulty', 'solution_length', 'dead_ends', 'junctions',
+                     'branching_factor', 'mean_corridor', 'expansion_ratio'):
+            values = metrics[name]
+            print(f"  {name:<17} mean {np.nanmean(values):8.3f}  "
+                  f"min {np.nanmin(values):8.3f}  max {np.nanmax(values):8.3f}")
+    if args.out:
+        np.savez_compressed(args.out, seeds=seeds, grids=grids, scores=scores)
+        print(f"saved to {args.out}")
+    return 0 if len(seeds) == args.count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
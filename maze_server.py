@@ -0,0 +1,603 @@
+# Asyncio multiplayer server: players and the A*/Dijkstra bots race in shared mazes.
+#
+# Each session wraps a headless MazeGame for the maze, terrain and bots. One
+# task ticks every session at a fixed rate and broadcasts a compact delta of
+# the agents that moved during that tick. Clients rebuild the maze from the
+# session seed, so the grid itself is never sent.
+#
+#   python maze_server.py serve --port 8765
+#   python maze_server.py client --host 127.0.0.1 --port 8765
+#   python maze_server.py loadtest --sessions 1000 --players 4 --seconds 10
+#   python maze_server.py loadtest --sessions 1000 --connect 127.0.0.1:8765
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+
+from Maze_Game import MazeGame, pygame
+
+# Message layouts. Stream transports prefix every frame with its length.
+HELLO = struct.Struct('<BQHB')  # type, maze seed, maze size, your agent id
+DELTA = struct.Struct('<BIB')   # type, tick, number of entries that follow
+ENTRY = struct.Struct('<BH')    # agent id, flat cell index (GONE once removed)
+INPUT = struct.Struct('<Bbb')   # type, dx, dy
+LENGTH = struct.Struct('<H')
+MSG_HELLO, MSG_DELTA, MSG_INPUT = 1, 2, 3
+GONE = 0xFFFF
+# Every flat cell index must fit in an ENTRY and stay below GONE
+MAX_SIZE = 255
+
+# Agent ids 0 and 1 are the bots, players start at 2
+AI_ID, DIJKSTRA_ID, FIRST_PLAYER_ID = 0, 1, 2
+# A delta counts its entries in one byte, so at most 255 agents including the bots
+MAX_AGENT_ID = 254
+MAX_PLAYERS = MAX_AGENT_ID - FIRST_PLAYER_ID + 1
+# Ticks a player waits after stepping onto plain floor; terrain scales it
+PLAYER_STEP_TICKS = 2
+
+
+class StreamConnection:
+    # Ticks broadcast without awaiting, so a peer that stops reading is dropped
+    # once this much is queued for it rather than buffered without limit
+    MAX_BUFFERED = 256 * 1024
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def send(self, frame):
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > self.MAX_BUFFERED:
+            # Closing makes the pending receive() return None, so the peer leaves
+            self.writer.transport.abort()
+            return
+        self.writer.write(LENGTH.pack(len(frame)) + frame)
+
+    async def receive(self):
+        # Next frame, or None once the peer has gone
+        try:
+            header = await self.reader.readexactly(LENGTH.size)
+            return await self.reader.readexactly(LENGTH.unpack(header)[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    def close(self):
+        self.writer.close()
+
+
+class LoopbackConnection:
+    # In-process stand-in for a socket: frames go straight into the peer's queue
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.peer = None
+
+    def send(self, frame):
+        if self.peer is not None:
+            self.peer.inbox.put_nowait(frame)
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    def close(self):
+        if self.peer is not None:
+            self.peer.inbox.put_nowait(None)
+            self.peer.peer = None
+            self.peer = None
+
+
+def loopback_pair():
+    a, b = LoopbackConnection(), LoopbackConnection()
+    a.peer, b.peer = b, a
+    return a, b
+
+
+def decode_delta(frame, cols):
+    # Yields (agent id, (x, y) or None) for every entry in a delta frame
+    _, tick, count = DELTA.unpack_from(frame)
+    for agent, cell in ENTRY.iter_unpack(frame[DELTA.size:DELTA.size + count * ENTRY.size]):
+        yield agent, None if cell == GONE else (cell % cols, cell // cols)
+
+
+class Session:
+    def __init__(self, seed, size, capacity, bot_every):
+        self.size = size
+        self.capacity = capacity
+        self.bot_every = bot_every
+        self.rng = random.Random(seed)
+        self.bot_phase = self.rng.randrange(bot_every)  # Spreads bot moves across ticks
+        self.players = {}      # agent id -> position
+        self.connections = {}  # agent id -> connection
+        self.inputs = {}       # agent id -> (dx, dy), at most one step per player per tick
+        self.moved = {}        # agent id -> new position (None when removed)
+        self.ready = {}        # agent id -> first tick it may step again
+        self.tick_count = 0
+        self.new_round()
+
+    def new_round(self):
+        self.game = MazeGame(seed=self.rng.randrange(2**32), headless=True, size=self.size)
+        self.game.plan_agents()
+        self.moved.clear()
+        self.ready.clear()
+        self.ready[AI_ID] = self.ready[DIJKSTRA_ID] = self.tick_count + 1 + self.bot_phase
+        for agent in self.players:
+            self.players[agent] = self.game.start
+        for agent, connection in self.connections.items():
+            self.send_hello(agent, connection)
+
+    def is_full(self):
+        return len(self.players) >= self.capacity
+
+    def positions(self):
+        yield AI_ID, self.game.ai_position
+        yield DIJKSTRA_ID, self.game.dijkstra_position
+        yield from self.players.items()
+
+    def encode_delta(self, entries):
+        cols = self.game.COLS
+        frame = bytearray(DELTA.pack(MSG_DELTA, self.tick_count, len(entries)))
+        for agent, pos in entries:
+            frame += ENTRY.pack(agent, GONE if pos is None else pos[1] * cols + pos[0])
+        return bytes(frame)
+
+    def send_hello(self, agent, connection):
+        # A newcomer gets the seed plus one full snapshot; after that only deltas
+        connection.send(HELLO.pack(MSG_HELLO, self.game.seed, self.size, agent))
+        connection.send(self.encode_delta(list(self.positions())))
+
+    def join(self, connection):
+        # Returns the new player's agent id, or None if every id is taken
+        agent = next((i for i in range(FIRST_PLAYER_ID, MAX_AGENT_ID + 1) if i not in self.players), None)
+        if agent is None:
+            return None
+        self.players[agent] = self.game.start
+        self.connections[agent] = connection
+        self.send_hello(agent, connection)
+        self.moved[agent] = self.game.start
+        return agent
+
+    def leave(self, agent):
+        del self.players[agent]
+        del self.connections[agent]
+        self.inputs.pop(agent, None)
+        self.ready.pop(agent, None)
+        self.moved[agent] = None
+
+    def queue_input(self, agent, dx, dy):
+        # A newer input replaces one not yet applied, so flooding gains nothing
+        self.inputs[agent] = (dx, dy)
+
+    def step_ticks(self, base, pos):
+        # Entering costly terrain keeps an agent there longer (roads halve the wait)
+        return max(1, round(base * self.game.move_time(pos)))
+
+    def tick(self):
+        self.tick_count += 1
+        game = self.game
+
+        for agent, (dx, dy) in list(self.inputs.items()):
+            if self.ready.get(agent, 0) > self.tick_count:
+                continue  # Still crossing the last cell; the input waits
+            del self.inputs[agent]
+            if agent not in self.players or abs(dx) + abs(dy) != 1:
+                continue
+            x, y = self.players[agent]
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < game.COLS and 0 <= ny < game.ROWS and game.maze[ny][nx] == 0:
+                self.players[agent] = self.moved[agent] = (nx, ny)
+                self.ready[agent] = self.tick_count + self.step_ticks(PLAYER_STEP_TICKS, (nx, ny))
+
+        if self.ready[AI_ID] <= self.tick_count:
+            before = game.ai_position
+            game.move_ai()
+            self.ready[AI_ID] = self.tick_count + self.step_ticks(self.bot_every, game.ai_position)
+            if game.ai_position != before:
+                self.moved[AI_ID] = game.ai_position
+        if self.ready[DIJKSTRA_ID] <= self.tick_count:
+            before = game.dijkstra_position
+            game.move_dijkstra()
+            self.ready[DIJKSTRA_ID] = self.tick_count + self.step_ticks(self.bot_every, game.dijkstra_position)
+            if game.dijkstra_position != before:
+                self.moved[DIJKSTRA_ID] = game.dijkstra_position
+
+        if not self.moved:
+            return 0
+        frame = self.encode_delta(list(self.moved.items()))
+        round_over = any(pos in game.goals for pos in self.moved.values())
+        self.moved.clear()
+        for connection in self.connections.values():
+            connection.send(frame)
+        if round_over:
+            self.new_round()
+        return len(frame) * len(self.connections)
+
+
+class MazeServer:
+    def __init__(self, tick_rate=20, size=20, capacity=8, bot_every=4, seed=None):
+        if not 2 <= size <= MAX_SIZE:
+            raise ValueError(f"maze size must be between 2 and {MAX_SIZE}, got {size}")
+        if not 1 <= capacity <= MAX_PLAYERS:
+            raise ValueError(f"players per session must be between 1 and {MAX_PLAYERS}, got {capacity}")
+        self.tick_rate = tick_rate
+        self.size = size
+        self.capacity = capacity
+        self.bot_every = bot_every
+        self.rng = random.Random(seed)
+        self.sessions = []
+        self.joinable = {}  # Sessions with a free seat (a dict keeps them in join order)
+        self.handlers = set()
+        self.server = None
+        self.running = False
+        self.ticks = 0
+        self.tick_seconds = 0.0
+        self.longest_tick = 0.0
+        self.bytes_sent = 0
+
+    def session_with_room(self):
+        if self.joinable:
+            return next(iter(self.joinable))
+        session = Session(self.rng.randrange(2**32), self.size, self.capacity, self.bot_every)
+        self.sessions.append(session)
+        self.joinable[session] = True
+        return session
+
+    async def serve_connection(self, connection):
+        session = self.session_with_room()
+        agent = session.join(connection)
+        if agent is None:
+            # Only reachable if a session holds more players than agent ids
+            self.joinable.pop(session, None)
+            connection.close()
+            return
+        if session.is_full():
+            del self.joinable[session]
+        try:
+            while True:
+                frame = await connection.receive()
+                if frame is None:
+                    break
+                if frame[0] == MSG_INPUT and len(frame) == INPUT.size:
+                    _, dx, dy = INPUT.unpack(frame)
+                    session.queue_input(agent, dx, dy)
+        finally:
+            session.leave(agent)
+            if session.players:
+                self.joinable[session] = True
+            else:
+                self.sessions.remove(session)
+                self.joinable.pop(session, None)
+            connection.close()
+
+    def connect_loopback(self):
+        # Returns the client end of an in-process connection to this server
+        server_end, client_end = loopback_pair()
+        handler = asyncio.ensure_future(self.serve_connection(server_end))
+        self.handlers.add(handler)
+        handler.add_done_callback(self.handlers.discard)
+        return client_end
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.server = await asyncio.start_server(
+            lambda reader, writer: self.serve_connection(StreamConnection(reader, writer)), host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def run(self):
+        # Fixed-rate tick: late ticks are not made up, the schedule just slips
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_tick = loop.time()
+        self.running = True
+        while self.running:
+            start = time.perf_counter()
+            for session in self.sessions:
+                self.bytes_sent += session.tick()
+            elapsed = time.perf_counter() - start
+            self.ticks += 1
+            self.tick_seconds += elapsed
+            self.longest_tick = max(self.longest_tick, elapsed)
+            next_tick = max(next_tick + interval, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+
+    def stop(self):
+        self.running = False
+        if self.server is not None:
+            self.server.close()
+
+
+class ClientView:
+    # Applies server frames to a windowed MazeGame that only renders
+    def __init__(self):
+        self.game = None
+        self.agent = None
+
+    def handle_frame(self, frame):
+        if frame[0] == MSG_HELLO:
+            _, seed, size, self.agent = HELLO.unpack(frame)
+            if self.game is None:
+                self.game = MazeGame(seed=seed, size=size)
+            else:
+                # New round: rebuild the maze locally from its seed
+                self.game.seed = seed
+                self.game.rng = random.Random(seed)
+                self.game.ROWS = self.game.COLS = size
+                self.game.CELL_SIZE = min(30, 600 // size)
+                self.game.reset_game()
+        elif frame[0] == MSG_DELTA and self.game is not None:
+            game = self.game
+            for agent, pos in decode_delta(frame, game.COLS):
+                if agent == self.agent:
+                    game.player_prev, game.player_target = game.player, pos
+                    game.player = pos
+                    game.player_anim = 10
+                elif agent == AI_ID:
+                    game.ai_prev, game.ai_target = game.ai_position, pos
+                    game.ai_position = pos
+                    game.ai_anim = 10
+                elif agent == DIJKSTRA_ID:
+                    game.dijkstra_prev, game.dijkstra_target = game.dijkstra_position, pos
+                    game.dijkstra_position = pos
+                    game.dijkstra_anim = 10
+                elif pos is None:
+                    game.remote_players.pop(agent, None)
+                else:
+                    game.remote_players[agent] = pos
+
+
+async def run_client(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    connection = StreamConnection(reader, writer)
+    view = ClientView()
+    keys = {pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1),
+            pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0)}
+
+    async def receive_frames():
+        while True:
+            frame = await connection.receive()
+            if frame is None:
+                return
+            view.handle_frame(frame)
+
+    receiver = asyncio.ensure_future(receive_frames())
+    running = True
+    while running and not receiver.done():
+        if view.game is not None:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key in keys:
+                    connection.send(INPUT.pack(MSG_INPUT, *keys[event.key]))
+            view.game.update()
+            view.game.draw()
+        await asyncio.sleep(1 / 60)
+    receiver.cancel()
+    connection.close()
+
+
+class LoadClient:
+    # Simulated player: one valid move at a time, timing each until the server
+    # broadcasts the resulting position
+    def __init__(self, connection, mazes, rng, latencies):
+        self.connection = connection
+        self.mazes = mazes
+        self.rng = rng
+        self.latencies = latencies
+        self.game = None
+        self.maze_key = None
+        self.agent = None
+        self.position = None
+        self.sent_at = None
+        self.ready_tick = 0  # Moves sent earlier would only wait out terrain on the server
+        self.stopping = False
+        self.warmup_until = 0
+        self.first_tick = None  # (tick, time) of the first and latest deltas seen
+        self.last_tick = None
+
+    def maze_for(self, seed, size):
+        # Bots in the same session share one copy of the current round's maze,
+        # counted so it is dropped once the last of them has moved on
+        self.release_maze()
+        self.maze_key = (seed, size)
+        if self.maze_key not in self.mazes:
+            self.mazes[self.maze_key] = [MazeGame(seed=seed, headless=True, size=size), 0]
+        entry = self.mazes[self.maze_key]
+        entry[1] += 1
+        return entry[0]
+
+    def release_maze(self):
+        if self.maze_key is None:
+            return
+        entry = self.mazes[self.maze_key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.mazes[self.maze_key]
+        self.maze_key = None
+
+    def next_move(self):
+        x, y = self.position
+        maze = self.game.maze
+        size = len(maze)
+        moves = [(dx, dy) for dx, dy in ((0, 1), (1, 0), (0, -1), (-1, 0))
+                 if 0 <= x + dx < size and 0 <= y + dy < size and maze[y + dy][x + dx] == 0]
+        if moves:
+            self.connection.send(INPUT.pack(MSG_INPUT, *self.rng.choice(moves)))
+            self.sent_at = time.perf_counter()
+
+    async def run(self):
+        # Runs until stop() is called; sessions send deltas every few ticks because
+        # the bots keep moving, so the flag is seen promptly
+        while not self.stopping:
+            frame = await self.connection.receive()
+            if frame is None:
+                break
+            now = time.perf_counter()
+            if frame[0] == MSG_HELLO:
+                _, seed, size, self.agent = HELLO.unpack(frame)
+                self.game = self.maze_for(seed, size)
+                self.position = None
+                self.sent_at = None
+                self.ready_tick = 0
+                continue
+            tick = DELTA.unpack_from(frame)[1]
+            if now >= self.warmup_until:
+                # Frames queued while thousands of clients connected would inflate the rate
+                if self.first_tick is None:
+                    self.first_tick = (tick, now)
+                self.last_tick = (tick, now)
+            for agent, pos in decode_delta(frame, self.game.COLS):
+                if agent == self.agent:
+                    if self.sent_at is not None and self.position is not None:
+                        self.latencies.append(now - self.sent_at)
+                        # Same wait as Session.tick, so latency measures the server, not terrain
+                        self.ready_tick = tick + max(1, round(PLAYER_STEP_TICKS * self.game.move_time(pos)))
+                    self.position = pos
+                    self.sent_at = None
+            # An input sent now is applied on the next tick
+            if self.sent_at is None and self.position is not None and tick + 1 >= self.ready_tick:
+                self.next_move()
+        self.release_maze()
+        self.connection.close()
+
+    def stop(self):
+        self.stopping = True
+
+    def observed_tick_rate(self):
+        if self.first_tick is None or self.last_tick[1] <= self.first_tick[1]:
+            return None
+        return (self.last_tick[0] - self.first_tick[0]) / (self.last_tick[1] - self.first_tick[1])
+
+
+async def connect_tcp(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    return StreamConnection(reader, writer)
+
+
+async def load_test(args):
+    # Drives an in-process server (loopback or TCP) or, with --connect, a server
+    # running elsewhere so that the load generator does not share its event loop
+    server = ticker = None
+    host, port = '127.0.0.1', None
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        port = int(port)
+    else:
+        server = MazeServer(tick_rate=args.tick_rate, size=args.size, capacity=args.players,
+                            bot_every=args.bot_every, seed=args.seed)
+        ticker = asyncio.ensure_future(server.run())
+        if args.tcp:
+            port = await server.start(port=0)
+
+    rng = random.Random(args.seed)
+    mazes = {}  # (seed, size) -> [game, clients using it]
+    latencies = []
+    clients = []
+    for _ in range(args.sessions * args.players):
+        if port is not None:
+            connection = await connect_tcp(host, port)
+        else:
+            connection = server.connect_loopback()
+        clients.append(LoadClient(connection, mazes, random.Random(rng.random()), latencies))
+
+    await asyncio.sleep(0)  # Let the server-side handlers join their sessions
+    started = time.perf_counter()
+    for client in clients:
+        client.warmup_until = started + min(1, args.seconds / 4)
+    if server is not None:
+        sessions = len(server.sessions)
+        ticks_before, bytes_before = server.ticks, server.bytes_sent
+    running = asyncio.gather(*(client.run() for client in clients))
+    await asyncio.sleep(args.seconds)
+    for client in clients:
+        client.stop()
+    elapsed = time.perf_counter() - started
+    await running
+
+    transport = 'loopback' if port is None else f'tcp to {host}:{port}'
+    print(f"{len(clients)} clients over {transport} for {elapsed:.1f} s")
+    if server is not None:
+        print(f"server: {sessions} sessions, "
+              f"ticks/s {(server.ticks - ticks_before) / elapsed:.1f} (target {args.tick_rate}), "
+              f"mean tick {server.tick_seconds / max(server.ticks, 1) * 1000:.2f} ms, "
+              f"longest {server.longest_tick * 1000:.2f} ms, "
+              f"delta traffic {(server.bytes_sent - bytes_before) / elapsed / 1024:.1f} KiB/s")
+        server.stop()
+        await ticker
+    rates = sorted(rate for rate in (client.observed_tick_rate() for client in clients) if rate)
+    if rates:
+        print(f"ticks/s seen by clients: median {rates[len(rates) // 2]:.1f}")
+
+    latencies.sort()
+    def percentile(p):
+        if not latencies:
+            return float('nan')
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    print(f"moves acknowledged: {len(latencies)} ({len(latencies) / elapsed:.0f}/s), "
+          f"latency p50 {percentile(50):.1f} ms, p99 {percentile(99):.1f} ms")
+    return 0
+
+
+async def serve(args):
+    server = MazeServer(tick_rate=args.tick_rate, size=args.size, capacity=args.players,
+                        bot_every=args.bot_every, seed=args.seed)
+    port = await server.start(args.host, args.port)
+    print(f"serving on {args.host}:{port} at {args.tick_rate} ticks/s")
+    await server.run()
+
+
+def bounded_int(low, high):
+    def integer(text):
+        value = int(text)
+        if not low <= value <= high:
+            raise argparse.ArgumentTypeError(f"must be between {low} and {high}, got {value}")
+        return value
+    return integer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multiplayer maze racing server")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_session_options(command):
+        command.add_argument('--tick-rate', type=int, default=20)
+        command.add_argument('--size', type=bounded_int(2, MAX_SIZE), default=20,
+                             metavar=f"2-{MAX_SIZE}")
+        command.add_argument('--players', type=bounded_int(1, MAX_PLAYERS), default=8,
+                             help=f"players per session (at most {MAX_PLAYERS})")
+        command.add_argument('--bot-every', type=int, default=4, help="ticks between bot moves on plain floor")
+        command.add_argument('--seed', type=int)
+
+    serve_command = commands.add_parser('serve', help="host sessions over TCP")
+    serve_command.add_argument('--host', default='127.0.0.1')
+    serve_command.add_argument('--port', type=int, default=8765)
+    add_session_options(serve_command)
+
+    client_command = commands.add_parser('client', help="join a server in a pygame window")
+    client_command.add_argument('--host', default='127.0.0.1')
+    client_command.add_argument('--port', type=int, default=8765)
+
+    load_command = commands.add_parser('loadtest', help="simulate many players and report throughput")
+    load_command.add_argument('--sessions', type=int, default=100)
+    load_command.add_argument('--seconds', type=float, default=10)
+    load_command.add_argument('--tcp', action='store_true', help="use real sockets instead of loopback")
+    load_command.add_argument('--connect', metavar='HOST:PORT', help="load an already running server")
+    add_session_options(load_command)
+    load_command.set_defaults(players=4)
+
+    args = parser.parse_args()
+    try:
+        if args.command == 'serve':
+            asyncio.run(serve(args))
+        elif args.command == 'client':
+            asyncio.run(run_client(args.host, args.port))
+        else:
+            return asyncio.run(load_test(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
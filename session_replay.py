@@ -0,0 +1,115 @@
+# Deterministic session recording and replay for the maze game.
+#
+# A recording holds the maze seed and size, a compact stream of input actions stamped
+# with the frame they happened on, and a digest of the final game state.
+# Replaying feeds the actions back through MazeGame.apply_action frame by
+# frame, with or without rendering, and as fast as the CPU allows.
+import argparse
+import hashlib
+import importlib
+import struct
+import sys
+import time
+
+from Maze_Game import MazeGame, pygame
+
+MAGIC = b'MZRP'
+# Bump whenever MazeGame.state_bytes, the action list or how agents plan and move
+# changes, so older recordings are rejected instead of reported as diverging
+VERSION = 4
+# magic, version, seed, starting maze size, end frame, action count, sha256 of the final state
+HEADER = struct.Struct('<4sBQHII32s')
+# frame, action code, two signed arguments
+ACTION = struct.Struct('<IBhh')
+
+
+class SessionRecorder:
+    def __init__(self, seed, size):
+        self.seed = seed
+        self.size = size
+        self.actions = bytearray()
+        self.count = 0
+
+    def record(self, frame, code, a, b):
+        self.actions += ACTION.pack(frame, code, a, b)
+        self.count += 1
+
+    def save(self, path, game):
+        digest = hashlib.sha256(game.state_bytes()).digest()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.size, game.frame, self.count, digest))
+            f.write(self.actions)
+
+
+class Recording:
+    def __init__(self, seed, size, end_frame, actions, digest):
+        self.seed = seed
+        self.size = size
+        self.end_frame = end_frame
+        self.actions = actions  # list of (frame, action name, a, b)
+        self.digest = digest
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, size, end_frame, count, digest = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} maze recording")
+        if len(data) != HEADER.size + count * ACTION.size:
+            raise ValueError(f"{path} is truncated")
+        actions = [(frame, MazeGame.ACTIONS[code], a, b)
+                   for frame, code, a, b in ACTION.iter_unpack(data[HEADER.size:])]
+        return cls(seed, size, end_frame, actions, digest)
+
+
+def replay(recording, render=False, headless=True):
+    # Runs the recorded session to its last frame and returns the finished game
+    game = MazeGame(seed=recording.seed, headless=headless, size=recording.size)
+    actions = recording.actions
+    next_action = 0
+
+    for frame in range(recording.end_frame):
+        while next_action < len(actions) and actions[next_action][0] == frame:
+            _, action, a, b = actions[next_action]
+            game.apply_action(action, a, b)
+            next_action += 1
+        game.update()
+        if render:
+            game.draw()
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded maze session")
+    parser.add_argument("recording", help="file written by Maze_Game.py --record")
+    parser.add_argument("--render", action="store_true", help="draw every frame while replaying")
+    parser.add_argument("--window", action="store_true", help="draw into a window instead of offscreen")
+    parser.add_argument("--repeat", type=int, default=1, help="replay several times (benchmarking)")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                        help="import a planner plugin the session was recorded with")
+    args = parser.parse_args()
+    
+    for module in args.plugin:
+        importlib.import_module(module)
+
+    recording = Recording.load(args.recording)
+    print(f"seed {recording.seed}, size {recording.size}, {recording.end_frame} frames, {len(recording.actions)} actions")
+
+    ok = True
+    for run in range(args.repeat):
+        start = time.perf_counter()
+        game = replay(recording, render=args.render or args.window, headless=not args.window)
+        elapsed = time.perf_counter() - start
+        match = hashlib.sha256(game.state_bytes()).digest() == recording.digest
+        ok = ok and match
+        print(f"run {run + 1}: {elapsed * 1000:.1f} ms, "
+              f"{recording.end_frame / max(elapsed, 1e-9):.0f} frames/s, "
+              f"end state {'matches' if match else 'DIFFERS'}")
+
+    pygame.quit()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())